@@ -1,17 +1,11 @@
+import logging
 import os
 import streamlit as st
-import time
-import seaborn as sns
-from wordcloud import WordCloud
-from textblob import TextBlob
 import pandas as pd
-import matplotlib.pyplot as plt
-from nltk.tokenize import word_tokenize
-from nltk.corpus import stopwords
-import string
-from YellowPagesScraper import Scraper
-import numpy as np
-from spellchecker import SpellChecker
+from page_fetcher import FETCH_MODES
+from progress import ProgressChannel, follow_scrape
+from analysis_cache import frame_hash, get_cache
+from metrics import configure_logging
 
 from pathlib import Path
 
@@ -19,15 +13,11 @@ from pathlib import Path
 scraper_thread = None
 data_dir = "data"
 
+log = logging.getLogger(__name__)
+configure_logging()
+
 if not os.path.exists(data_dir):
     os.makedirs(data_dir)
-def perform_sentiment_analysis(text):
-    if isinstance(text, str):
-        analysis = TextBlob(text)
-        return analysis.sentiment.polarity
-    return np.nan
-
-
 def extract_email_domain(email):
     if pd.notna(email):
         parts = email.split('@')
@@ -36,20 +26,15 @@ def extract_email_domain(email):
     return None
 
 
-def preprocess_text(text):
-    if not pd.isna(text):
-        tokens = word_tokenize(text.lower())
-        tokens = [word for word in tokens if word not in string.punctuation]
-        tokens = [word for word in tokens if word not in stopwords.words('english')]
-        return " ".join(tokens)
-    else:
-        return ""
-
-
 def eda(data):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    cache = get_cache()
+    data_hash = frame_hash(data)
     st.title("Exploratory Data Analysis (EDA)")
     st.write("## Summary Statistics")
-    st.write(data.describe())
+    st.write(cache.stage("describe", data_hash, data.describe))
 
     st.write("## Data Visualization")
     st.subheader("Histogram for 'postCode'")
@@ -58,16 +43,16 @@ def eda(data):
     st.pyplot(fig)
 
     st.subheader("Bar plot for 'state'")
-    state_counts = data['state'].value_counts()
+    state_counts = cache.stage("state_counts", data_hash, data['state'].value_counts)
     st.bar_chart(state_counts)
 
     st.write("## Data Cleaning")
     st.write("### Missing Values")
-    missing_values = data.isnull().sum()
+    missing_values = cache.stage("missing_values", data_hash, lambda: data.isnull().sum())
     st.write(missing_values)
 
     st.write("### Duplicate Rows")
-    duplicate_rows = data[data.duplicated()]
+    duplicate_rows = cache.stage("duplicate_rows", data_hash, lambda: data[data.duplicated()])
     st.write(duplicate_rows)
 
     st.write("## Outlier Detection")
@@ -80,7 +65,7 @@ def eda(data):
     st.write(data['suburb'].describe())
 
     st.subheader("Bar plot for 'suburb'")
-    suburb_counts = data['suburb'].value_counts()
+    suburb_counts = cache.stage("suburb_counts", data_hash, data['suburb'].value_counts)
     st.bar_chart(suburb_counts)
 
     st.write("## Geospatial Analysis")
@@ -94,7 +79,7 @@ def eda(data):
     st.write(unique_domains)
 
     st.subheader("Email Domain Counts")
-    domain_counts = df['email_domain'].value_counts()
+    domain_counts = cache.stage("email_domain_counts", data_hash, df['email_domain'].value_counts)
     st.bar_chart(domain_counts)
     num_rows_with_reviews = df['review'].notna().sum()
 
@@ -109,6 +94,8 @@ def eda(data):
 
 
 def check_misspelled_keywords(keywords):
+    from spellchecker import SpellChecker
+
     spell = SpellChecker()
     misspelled = spell.unknown(keywords)
     suggestions = {keyword: spell.candidates(keyword) for keyword in misspelled}
@@ -116,6 +103,10 @@ def check_misspelled_keywords(keywords):
 
 
 def nlp(df, keywords):
+    from sentiment import sentiment_counts, sentiment_scores
+    from term_index import render_word_cloud, term_index
+    from text_processing import preprocess_texts
+
     st.header("Natural Language Processing Analysis")
 
     misspelled_keywords, suggestions = check_misspelled_keywords(keywords)
@@ -128,38 +119,34 @@ def nlp(df, keywords):
         suggestions_table = pd.DataFrame(data)
         st.write(suggestions_table)
 
-    df['cleaned_description'] = df['description'].apply(preprocess_text)
-    df['reviews'] = df['review'].apply(preprocess_text)
+    cache = get_cache()
+    df['cleaned_description'] = cache.map_texts("preprocess", df['description'], preprocess_texts, batch=True)
+    df['reviews'] = cache.map_texts("preprocess", df['review'], preprocess_texts, batch=True)
     descriptions = df['cleaned_description'].dropna()
     reviews = df['reviews'].dropna()
 
     st.subheader("Descriptions Word Cloud")
-    wordcloud = WordCloud(width=800, height=400, background_color="white").generate(" ".join(descriptions))
-    st.image(wordcloud.to_array())
+    wordcloud = render_word_cloud(cache, descriptions)
+    if wordcloud is not None:
+        st.image(wordcloud)
 
     st.subheader("Word Frequency Analysis")
-    word_freq = pd.Series(" ".join(descriptions).lower().split()).value_counts()[:20]
-    st.bar_chart(word_freq)
+    st.bar_chart(term_index(cache, descriptions).most_common(20))
 
     st.subheader("Description Sentiment Analysis")
-    sentiments = descriptions.apply(lambda text: TextBlob(text).sentiment.polarity)
-    sentiment_labels = ["Positive" if score > 0 else "Negative" if score < 0 else "Neutral" for score in sentiments]
-    sentiment_counts = pd.Series(sentiment_labels).value_counts()
-    st.bar_chart(sentiment_counts)
+    st.bar_chart(sentiment_counts(sentiment_scores(cache, descriptions)))
     num_rows_with_reviews = scraped_data['review'].notna().sum()
 
-    print(num_rows_with_reviews)
+    log.debug("Rows with reviews: %s", num_rows_with_reviews)
     if num_rows_with_reviews:
         st.subheader("Review Word Cloud")
-        review_wordcloud = WordCloud(width=800, height=400, background_color="white").generate(" ".join(reviews))
-        st.image(review_wordcloud.to_array())
+        review_wordcloud = render_word_cloud(cache, reviews)
+        if review_wordcloud is not None:
+            st.image(review_wordcloud)
 
         st.title("Review Sentiment Analysis")
         st.subheader("Sentiment Analysis")
-        sentiments = reviews.apply(lambda text: TextBlob(text).sentiment.polarity)
-        sentiment_labels = ["Positive" if score > 0 else "Negative" if score < 0 else "Neutral" for score in sentiments]
-        sentiment_counts = pd.Series(sentiment_labels).value_counts()
-        st.bar_chart(sentiment_counts)
+        st.bar_chart(sentiment_counts(df['sentiment']))
 
 
 st.title("Business lookup Tool")
@@ -171,6 +158,7 @@ keywords = [kw.strip() for kw in keywords.split(',')]
 st.sidebar.header("Data Filters")
 postcode_filter = st.sidebar.text_input("Enter Postcode (optional):")
 number_of_records = st.sidebar.text_input("Enter Records (optional):")
+fetch_mode = st.sidebar.selectbox("Fetch mode", FETCH_MODES)
 if st.sidebar.button("Start"):
     if not keywords:
         st.warning("Please enter at least one keyword.")
@@ -180,36 +168,38 @@ if st.sidebar.button("Start"):
             scraper_thread = None
 
         st.info(f"Scraping data for keywords: {', '.join(keywords)}")
+        first_csv_file = None
         with st.spinner("Scraping data please wait"):
             csv_files = [f for f in os.listdir("data") if f.endswith(".csv")]
             sorted_csv_files = sorted(csv_files, key=lambda x: Path(data_dir, x).stat().st_ctime, reverse=True)
             if csv_files:
                 first_csv_file = sorted_csv_files[0]
             else:
-                scraper = Scraper([keywords[0]])
+                progress = ProgressChannel(1)
+                from YellowPagesScraper import Scraper
+                scraper = Scraper([keywords[0]], fetch_mode=fetch_mode, progress=progress)
                 scraper.start()
-                while True:
-                    csv_files = [f for f in os.listdir("data") if f.endswith(".csv")]
-                    sorted_csv_files = sorted(csv_files, key=lambda x: Path(data_dir, x).stat().st_ctime, reverse=True)
-                    if csv_files:
-                        first_csv_file = sorted_csv_files[0]
-                        break
-                    time.sleep(1)
+                filename = follow_scrape(scraper, progress, st)
+                if filename:
+                    first_csv_file = os.path.basename(filename)
+        if first_csv_file is None:
+            st.warning("The scraper stopped before saving any data.")
+            st.stop()
         try:
-            scraped_data = pd.read_csv(f"data/{first_csv_file}")
-            df = pd.DataFrame(scraped_data)
-            if postcode_filter:
-                df = df[df['postCode'] == int(postcode_filter)]
+            from dataset_store import load_results
+            from sentiment import sentiment_scores
 
-            if number_of_records:
-                df = df.head(int(number_of_records))
+            df = load_results(f"data/{first_csv_file}", postcode=int(postcode_filter) if postcode_filter else None,
+                              limit=int(number_of_records) if number_of_records else None)
+            scraped_data = df
             df['email_domain'] = df['email'].apply(extract_email_domain)
-            df['sentiment'] = df['review'].apply(perform_sentiment_analysis)
+            df['sentiment'] = sentiment_scores(get_cache(), df['review'])
             st.write(df)
             eda(df)
             nlp(df,keywords)
-        except Exception as e:
-            print(e)
+            get_cache().flush()
+        except Exception:
+            log.exception("Loading results failed")
             st.warning("Something went wrong")
 
 
@@ -1,35 +1,102 @@
-import json
-import math
-import re
+import logging
+import os
 import sys
+import collections
 import threading
-import time
 import pandas as pd
 import datetime
-from PyQt5.QtCore import QCoreApplication, Qt, QThread, pyqtSignal
+from PyQt5.QtCore import QThread, pyqtSignal
 from PyQt5.QtWidgets import QApplication, QMainWindow
 from PyQt5.QtWebEngineWidgets import QWebEngineView
-from PyQt5.QtCore import QUrl
+import functools
 from bs4 import BeautifulSoup
-from colorama import Fore, Style
 import warnings
 import requests
+from requests.adapters import HTTPAdapter
 import xmltodict
-import json
 from fake_useragent import UserAgent
+from concurrent.futures import Future
+from crawl_scheduler import CrawlScheduler, MAX_IN_FLIGHT, MAX_PER_HOST
+from abn_matcher import MATCH_THRESHOLD, CandidateIndex
+from abr_index import ABR_INDEX_PATH, ABRIndex
+from checkpoint import CrawlCheckpoint
+from abn_cache import ABN_CACHE_PATH, ABNCache, MISSING, SOURCE_ABR, SOURCE_YELLOW, name_key
+from enrichment import ENRICHMENT_WORKERS, EnrichmentPipeline, ResultSink, SessionPool
+from output_writer import StreamingCSVWriter
+from dataset_store import DatasetWriter
+from listing_dedup import MATCHES_DIR, ListingDeduplicator, key_fields
+from page_loader import PageStateLoader
+from rate_limiter import get_rate_limiter
+from metrics import PROFILE, MetricsExporter, configure_logging, get_metrics
+from page_fetcher import FETCH_MODE_BROWSER, FETCH_MODE_FARM, FETCH_MODE_HTTP, SEARCH_URL, check_fetch_mode, \
+    count_pages, fetch_initial_state
+from listing_parser import LISTING_FIELDS, Listing, parse_listings, parse_page, log_listing
+from browser_farm import FARM_WORKERS, BrowserFarm
 
 warnings.filterwarnings("ignore", category=DeprecationWarning)
 scraped_data = []
 MaxRecords = 500
+ABR_SEARCH_URL = 'https://abr.business.gov.au/abrxmlsearch/AbrXmlSearch.asmx/ABRSearchByNameAdvancedSimpleProtocol'
+
+log = logging.getLogger(__name__)
 
 
 class ABRSearcher:
-    def __init__(self, authentication_guid):
+    def __init__(self, authentication_guid, session=None, cache=None, match_threshold=MATCH_THRESHOLD, local_index=None,
+                 rate_limiter=None):
         self.authentication_guid = authentication_guid
-        self.base_url = 'https://abr.business.gov.au/abrxmlsearch/AbrXmlSearch.asmx/ABRSearchByNameAdvancedSimpleProtocol'
+        self.rate_limiter = rate_limiter or get_rate_limiter()
+        self.base_url = ABR_SEARCH_URL
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_maxsize=ENRICHMENT_WORKERS)
+            session.mount("https://", adapter)
+        self.session = session
+        self.cache = cache
+        self.match_threshold = match_threshold
+        self.local_index = local_index
+        self.in_flight = {}
+        self.lock = threading.Lock()
+
+    def search_local(self, keyword, post_code="", state=""):
+        if self.local_index is None:
+            return None
+        candidates = self.local_index.candidates(keyword, post_code, state)
+        best_match = CandidateIndex(candidates).best_match(keyword, post_code, state, threshold=self.match_threshold)
+        return best_match.get("ABN") if best_match else None
+
+    def search_businesses(self, keyword, post_code="", max_results=100, state=""):
+        abn = self.search_local(keyword, post_code, state)
+        if abn:
+            return abn
+        cache_key = name_key(keyword, post_code)
+        if self.cache is not None:
+            cached = self.cache.get(SOURCE_ABR, cache_key)
+            if cached is not MISSING:
+                return cached
+        with self.lock:
+            future = self.in_flight.get(cache_key)
+            leader = future is None
+            if leader:
+                future = self.in_flight[cache_key] = Future()
+        if not leader:
+            return future.result()
+        try:
+            abn, completed = self.find_best_match(keyword, post_code, max_results, state)
+            if self.cache is not None and completed:
+                self.cache.put(SOURCE_ABR, cache_key, abn)
+            future.set_result(abn)
+            return abn
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self.lock:
+                del self.in_flight[cache_key]
 
-    def search_businesses(self, keyword, post_code="", max_results=100):
+    def find_best_match(self, keyword, post_code="", max_results=100, state=""):
         businesses = []
+        completed = False
         params = {
             'name': keyword,
             'postcode': "",
@@ -49,12 +116,13 @@ class ABRSearcher:
             'maxSearchResults': max_results}
 
         try:
-            response = requests.get(self.base_url, params=params)
+            response = self.rate_limiter.request(self.session, self.base_url, params=params, timeout=30)
             if response.status_code == 200:
                 data = xmltodict.parse(response.text)
                 if 'ABRPayloadSearchResults' in data:
-                    search_results = data['ABRPayloadSearchResults']['response']['searchResultsList'][
-                        'searchResultsRecord']
+                    payload = data['ABRPayloadSearchResults']['response']
+                    completed = 'exception' not in payload
+                    search_results = (payload.get('searchResultsList') or {}).get('searchResultsRecord') or []
                     if not isinstance(search_results, list):
                         search_results = [search_results]
                     for result in search_results:
@@ -65,178 +133,364 @@ class ABRSearcher:
                         name = mainName.get('organisationName', '')
                         if not name:
                             name = result.get('legalName', {}).get('fullName')
-                        state = result['mainBusinessPhysicalAddress']['stateCode']
-                        postcode = result['mainBusinessPhysicalAddress']['postcode']
+                        business_state = result['mainBusinessPhysicalAddress']['stateCode']
+                        business_postcode = result['mainBusinessPhysicalAddress']['postcode']
                         is_current = result['mainBusinessPhysicalAddress']['isCurrentIndicator'] == 'Y'
                         businesses.append({
                             'ABN': abn,
                             'Name': name,
-                            'State': state,
-                            'Postcode': postcode,
+                            'State': business_state,
+                            'Postcode': business_postcode,
                             'IsCurrent': is_current
                         })
             else:
-                print(f"Request failed with status code {response.status_code}")
+                log.warning("ABR request failed with status code %s", response.status_code)
         except Exception as e:
-            print(f"An error occurred: {e}")
-        best_match = None
-        best_match_score = 0
-        for business in businesses:
-            name = business.get("Name", "").replace(" ", "").replace(".", "").lower()
-            keyword_normalized = keyword.replace(" ", "").replace(".", "").lower()
-
-            score = 0
-            for char in keyword_normalized:
-                if char in name:
-                    score += 1
-
-            if score >= best_match_score:
-                best_match_score = score
-                best_match = business
-        if best_match:
-            return best_match.get("ABN")
-        return None
+            log.warning("ABR search for '%s' failed: %s", keyword, e)
+        best_match = CandidateIndex(businesses).best_match(keyword, post_code, state, threshold=self.match_threshold)
+        abn = best_match.get("ABN") if best_match else None
+        return abn, completed
 
 
 class YellowPagesScraper(QMainWindow):
-    def __init__(self, keywords):
+    render_requested = pyqtSignal(str, object)
+    page_fetched = pyqtSignal(str, object)
+    crawl_finished = pyqtSignal()
+
+    def __init__(self, keywords, fetch_mode=FETCH_MODE_BROWSER, max_in_flight=MAX_IN_FLIGHT,
+                 max_per_host=MAX_PER_HOST, enrichment_workers=ENRICHMENT_WORKERS, abn_cache_path=ABN_CACHE_PATH,
+                 abr_index_path=ABR_INDEX_PATH, resume=True, keep_rows=False, progress=None,
+                 farm_workers=FARM_WORKERS, profile=PROFILE):
         super().__init__()
+        configure_logging()
+        self.metrics = get_metrics()
+        self.metrics.reset()
+        if profile:
+            self.metrics.enable_profiling()
         self.keywords = keywords
-        self.scraped_data = []
-        self.browser = QWebEngineView()
-        self.browser.setPage(self.browser.page())
-        self.browser.loadFinished.connect(self.on_load_finished)
+        self.progress = progress
+        self.fetch_mode = check_fetch_mode(fetch_mode)
+        self.max_in_flight = max_in_flight
+        self.max_per_host = max_per_host
+        self.farm_workers = farm_workers
+        self.browser = None
+        if self.fetch_mode == FETCH_MODE_BROWSER:
+            self.get_browser()
+        self.render_queue = collections.deque()
+        self.rendering = None
+        self.render_requested.connect(self.queue_render)
+        self.page_fetched.connect(self.on_fetched)
+        self.crawl_finished.connect(self.save_to_csv)
         self.current_keyword_index = 0
         self.pageNumber = 1
         self.total_pages = 1
+        self.current_page = None
         self.timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
+        self.checkpoint = CrawlCheckpoint(keywords) if resume else None
+        if self.checkpoint is not None:
+            self.timestamp = self.checkpoint.timestamp
+        self.csv_writer = StreamingCSVWriter(f"data/yellowpages_data_{self.timestamp}.csv", LISTING_FIELDS)
+        self.dataset_writer = DatasetWriter(self.timestamp)
+        self.results = ResultSink(writers=[self.dataset_writer, self.csv_writer], keep_rows=keep_rows)
+        self.scraped_data = self.results.rows
+        self.dedup = ListingDeduplicator(os.path.join(MATCHES_DIR, f"yellowpages_keywords_{self.timestamp}.csv"))
+        if self.checkpoint is not None and self.checkpoint.resumed:
+            for row in self.checkpoint.iter_rows():
+                row = Listing.from_dict(row)
+                self.dedup.add(row, row.get("keyword", ""))
+                self.results.add(row)
+            for keyword, row in self.checkpoint.iter_duplicates():
+                self.dedup.add_match(row, keyword)
+            if self.progress is not None:
+                for keyword, page in self.checkpoint.completed_pages():
+                    self.progress.page_skipped(keyword, self.checkpoint.page_count(keyword))
+            log.info("Resuming run %s with %s rows already scraped.", self.timestamp, len(self.results))
         self.authentication_guid = "3ecee520-acf0-4b47-80f2-25ee15f00bc9"
-        self.abr_scraper = ABRSearcher(self.authentication_guid)
+        self.sessions = SessionPool(pool_size=enrichment_workers)
+        self.rate_limiter = get_rate_limiter()
+        self.abn_cache = ABNCache(abn_cache_path) if abn_cache_path else None
+        self.abr_index = ABRIndex(abr_index_path) if abr_index_path and os.path.exists(abr_index_path) else None
+        self.abr_scraper = ABRSearcher(self.authentication_guid, session=self.sessions.for_host(ABR_SEARCH_URL),
+                                       cache=self.abn_cache, local_index=self.abr_index,
+                                       rate_limiter=self.rate_limiter)
         self.user_agent = UserAgent()
-        self.threads = []
+        self.enrichment = EnrichmentPipeline(self.enrich_listing, self.results, workers=enrichment_workers,
+                                             on_done=self.on_listing_done)
+        self.metrics.add_collector(self.collect_metrics)
+        self.exporter = MetricsExporter(self.metrics).start()
 
+    def collect_metrics(self):
+        yield "queue_depth", self.enrichment.pending(), {"queue": "enrichment"}
+        yield "queue_depth", len(self.render_queue), {"queue": "render"}
+        if self.abn_cache is not None:
+            for source, stats in self.abn_cache.stats().items():
+                yield "abn_cache_hit_rate", stats["hit_rate"], {"source": source}
+        for host, stats in self.rate_limiter.stats().items():
+            yield "rate_limit_requests_per_second", stats["rate"], {"host": host}
+
+    def get_browser(self):
+        if self.browser is None:
+            self.browser = QWebEngineView()
+            self.browser.setPage(self.browser.page())
+            self.page_loader = PageStateLoader(self.browser, self.on_browser_state, rate_limiter=get_rate_limiter())
+        return self.browser
+
+    def load_in_browser(self, url):
+        self.get_browser()
+        self.page_loader.load(url)
 
     def load_next_url(self):
-        if self.current_keyword_index < len(self.keywords):
+        while self.current_keyword_index < len(self.keywords):
             keyword = self.keywords[self.current_keyword_index]
-            url = f"https://www.yellowpages.com.au/search/listings?clue={keyword}&locationClue=New+South+Wales&lat=&lon=&pageNumber={self.pageNumber}"
-            if self.pageNumber <= self.total_pages:
-                # if self.pageNumber <= self.total_pages:
-                url = QUrl(url)
-                print(f"Requesting data for '{keyword}' (Page {self.pageNumber}) from server, please wait.")
-                self.browser.load(url)
-                self.pageNumber += 1
-            else:
+            if self.pageNumber > self.total_pages:
                 self.current_keyword_index += 1
                 self.pageNumber = 1
                 self.total_pages = 1
-                self.load_next_url()
-        else:
-            self.save_to_csv()
+                continue
+            if self.checkpoint is not None and self.checkpoint.is_done(keyword, self.pageNumber):
+                self.total_pages = max(self.total_pages, self.checkpoint.page_count(keyword) or 1)
+                self.pageNumber += 1
+                continue
+            url = SEARCH_URL.format(keyword=keyword, location="New+South+Wales", page=self.pageNumber)
+            log.info("Requesting data for '%s' (Page %s) from server.", keyword, self.pageNumber)
+            self.current_page = (keyword, self.pageNumber)
+            if self.fetch_mode == FETCH_MODE_HTTP:
+                # The fetch blocks on rate-limit waits and the network, so it runs off the Qt thread.
+                threading.Thread(target=self.fetch_url, args=(url,), daemon=True).start()
+            else:
+                self.load_in_browser(url)
+            self.pageNumber += 1
+            return
+        self.save_to_csv()
 
     def run(self):
-        self.load_next_url()
+        if self.fetch_mode == FETCH_MODE_FARM:
+            t = threading.Thread(target=self.crawl_with_farm)
+            t.start()
+        elif self.fetch_mode == FETCH_MODE_HTTP and self.max_in_flight > 1:
+            t = threading.Thread(target=self.crawl_concurrently)
+            t.start()
+        else:
+            self.load_next_url()
+
+    def make_scheduler(self, fetch, page_count, on_page, max_in_flight, max_per_host):
+        return CrawlScheduler(
+            url_for=lambda keyword, page: SEARCH_URL.format(keyword=keyword, location="New+South+Wales", page=page),
+            fetch=fetch,
+            page_count=page_count,
+            on_page=on_page,
+            max_in_flight=max_in_flight,
+            max_per_host=max_per_host,
+            is_done=self.checkpoint.is_done if self.checkpoint is not None else None,
+            known_page_count=self.checkpoint.page_count if self.checkpoint is not None else None)
+
+    def crawl_concurrently(self):
+        scheduler = self.make_scheduler(
+            self.fetch_page_state, lambda json_data: count_pages(json_data["model"]["pagination"], MaxRecords),
+            self.on_page, self.max_in_flight, self.max_per_host)
+        scheduler.crawl(self.keywords)
+        self.crawl_finished.emit()
+
+    def crawl_with_farm(self):
+        # Each farm worker renders one page at a time, so the farm size is the concurrency limit.
+        farm = BrowserFarm(self.farm_workers, parse=functools.partial(parse_page, max_records=MaxRecords)).start()
+        try:
+            scheduler = self.make_scheduler(farm.fetch, lambda parsed: parsed[1], self.on_parsed_page, farm.workers,
+                                            farm.workers)
+            scheduler.crawl(self.keywords)
+        finally:
+            farm.close()
+        self.crawl_finished.emit()
+
+    def fetch_page_state(self, url):
+        json_data = fetch_initial_state(url)
+        if json_data is None:
+            log.info("No page state in HTTP response for %s, falling back to browser.", url)
+            json_data = self.render_state(url)
+        return json_data
+
+    def render_state(self, url):
+        future = Future()
+        self.render_requested.emit(url, future)
+        return future.result()
+
+    def queue_render(self, url, future):
+        self.render_queue.append((url, future))
+        if self.rendering is None:
+            self.render_next()
+
+    def render_next(self):
+        if self.render_queue:
+            url, self.rendering = self.render_queue.popleft()
+            self.load_in_browser(url)
+        else:
+            self.rendering = None
+
+    def on_page(self, keyword, page, json_data):
+        if json_data is None:
+            self.page_failed(keyword, page)
+            return
+        log.info("Received data for '%s' (Page %s).", keyword, page)
+        total_pages = count_pages(json_data["model"]["pagination"], MaxRecords)
+        self.start_enrichment(self.parse_listings(json_data), keyword, page, total_pages)
+
+    def page_failed(self, keyword, page):
+        log.warning("No page state for '%s' (Page %s).", keyword, page)
+        self.metrics.inc("pages_failed")
+        if self.checkpoint is not None:
+            self.checkpoint.page_failed(keyword, page)
+        if self.progress is not None:
+            self.progress.page_failed()
+
+    def on_parsed_page(self, keyword, page, parsed):
+        if parsed is None:
+            self.on_page(keyword, page, None)
+            return
+        log.info("Received data for '%s' (Page %s).", keyword, page)
+        listings, total_pages = parsed
+        for company_info in listings:
+            log_listing(company_info)
+        self.start_enrichment(listings, keyword, page, total_pages)
 
     def get_abn_from_yellow(self, link):
+        with self.metrics.timer("enrich_seconds", source="yellow"):
+            return self.fetch_abn_from_yellow(link)
+
+    def fetch_abn_from_yellow(self, link):
+        if self.abn_cache is not None:
+            cached = self.abn_cache.get(SOURCE_YELLOW, link)
+            if cached is not MISSING:
+                return cached
         headers = {'User-Agent': self.user_agent.random}
-        res = requests.get(link, headers=headers)
-        time.sleep(0.1)
+        res = self.rate_limiter.request(self.sessions.get(link), link, headers=headers, timeout=30)
+        abn = None
         if res.status_code == 200:
             soup = BeautifulSoup(res.text, 'html.parser')
             try:
                 abn = soup.find("dd", class_="abn").text
             except:
                 abn = None
+            if self.abn_cache is not None:
+                self.abn_cache.put(SOURCE_YELLOW, link, abn)
         return abn
 
-    def get_abn_from_abr(self, name, postcode):
-        return self.abr_scraper.search_businesses(name, postcode)
-
-    def get_abn_numbers(self, data):
-        abn_scraper_data = []
-        print(data)
-        for obj in data:
-            if obj.get("detailsLink"):
-                abn = self.get_abn_from_yellow(obj.get("detailsLink"))
-                if not abn:
-                    abn = self.get_abn_from_abr(obj.get("name"), obj.get("postCode"))
-                if abn:
-                    obj["abn"] = abn
-                    abn_scraper_data.append(obj)
-        self.scraped_data.extend(abn_scraper_data)
-
-    def on_load_finished(self):
-        self.browser.page().toHtml(self.save_html)
-
-    def save_html(self, html_content):
-        _scraped_data = []
-        soup = BeautifulSoup(html_content, 'html.parser')
-        pattern = re.compile(r"window\.__INITIAL_STATE__ = ({.*?});", re.MULTILINE | re.DOTALL)
-        script_tag = soup.find("script", text=pattern)
-        if not script_tag:
-            print("Something went wrong, not able to see the data")
+    def get_abn_from_abr(self, name, postcode, state=""):
+        with self.metrics.timer("enrich_seconds", source="abr"):
+            return self.abr_scraper.search_businesses(name, postcode, state=state)
+
+    def enrich_listing(self, obj):
+        with self.metrics.stage("enrich"):
+            return self.enrich_with_abn(obj)
+
+    def enrich_with_abn(self, obj):
+        if obj.get("detailsLink"):
+            abn = self.get_abn_from_yellow(obj.get("detailsLink"))
+            if not abn:
+                abn = self.get_abn_from_abr(obj.get("name"), obj.get("postCode"), obj.get("state"))
+            if abn:
+                obj["abn"] = abn
+                return obj
+        return None
+
+    def fetch_url(self, url):
+        self.page_fetched.emit(url, fetch_initial_state(url))
+
+    def on_fetched(self, url, json_data):
+        if json_data is None:
+            log.info("No page state in HTTP response for %s, falling back to browser.", url)
+            self.load_in_browser(url)
+            return
+        self.save_state(json_data)
+
+    def on_browser_state(self, json_data):
+        if self.rendering is not None:
+            self.rendering.set_result(json_data)
+            self.render_next()
+            return
+        self.save_state(json_data)
+
+    def save_state(self, json_data):
+        if json_data is None:
+            self.page_failed(*self.current_page)
         else:
-            match = pattern.search(script_tag.string)
-            initial_state_data = match.group(1)
-            json_data = json.loads(initial_state_data)
-            inAreaResultViews = json_data["model"]["inAreaResultViews"]
-            pagination = json_data["model"]["pagination"]
             if self.total_pages == 1:
-                totalResults = pagination['totalResults'] if pagination['totalResults'] < MaxRecords else MaxRecords
-                self.total_pages = math.ceil(totalResults / 35)
-            for bus in inAreaResultViews:
-                try:
-                    featuredReview = ""
-                    avg_review = bus.get("averageRatings", {})
-                    yellow_summery = avg_review.get("yellowReviewSummary", {})
-                    searchableAddress = bus.get('searchableAddress', {})
-                    if yellow_summery is not None:
-                        featuredReview = yellow_summery.get('featuredReview', {}).get("reviewText")
-                    addressView = bus.get("addressView", {})
-                    company_info = {
-                        "address": addressView.get("asContactCardFormat", ""),
-                        "postCode": addressView.get("postCode", ""),
-                        "state": addressView.get("state", ""),
-                        "suburb": addressView.get("suburb", ""),
-                        "phone": bus.get("callContactNumber", {}).get("displayValue", ""),
-                        "category": bus.get("category").get("name"),
-                        "description": bus.get("longDescriptor", ""),
-                        "name": bus.get("name", ""),
-                        "email": bus.get("primaryEmail", ""),
-                        "detailsLink": bus.get("detailsLink", ""),
-                        "review": featuredReview,
-                        "longitude": searchableAddress.get('longitude', ""),
-                        "latitude": searchableAddress.get("latitude", "")
-                    }
-                    _scraped_data.append(company_info)
-                    print(Fore.BLUE + "Company Information:")
-                    print(Fore.CYAN + f"Address: {company_info['address']}")
-                    print(Fore.CYAN + f"PostCode: {company_info['postCode']}")
-                    print(Fore.CYAN + f"State: {company_info['state']}")
-                    print(Fore.CYAN + f"Suburb: {company_info['suburb']}")
-                    print(Fore.CYAN + f"Phone: {company_info['phone']}")
-                    print(Fore.CYAN + f"Category: {company_info['category']}")
-                    print(Fore.CYAN + f"Description: {company_info['description']}")
-                    print(Fore.CYAN + f"Name: {company_info['name']}")
-                    print(Fore.CYAN + f"Email: {company_info['email']}")
-                    print(Fore.RESET)
-                    print("-" * 30)
-                except:
-                    continue
-        time.sleep(1)
-        t = threading.Thread(target=self.get_abn_numbers, args=(_scraped_data,))
-        t.start()
-        self.threads.append(t)
+                self.total_pages = count_pages(json_data["model"]["pagination"], MaxRecords)
+            keyword, page = self.current_page
+            self.start_enrichment(self.parse_listings(json_data), keyword, page, self.total_pages)
         self.load_next_url()
 
+    def parse_listings(self, json_data):
+        with self.metrics.stage("parse"):
+            _scraped_data = parse_listings(json_data)
+        for company_info in _scraped_data:
+            log_listing(company_info)
+        return _scraped_data
+
+    def start_enrichment(self, _scraped_data, keyword, page, total_pages):
+        unique_listings = []
+        duplicates = []
+        for company_info in _scraped_data:
+            company_info["keyword"] = keyword
+            if self.dedup.add(company_info, keyword):
+                unique_listings.append(company_info)
+            else:
+                duplicates.append(key_fields(company_info))
+        self.metrics.inc("pages_scraped")
+        self.metrics.inc("listings_parsed", len(_scraped_data))
+        self.metrics.inc("duplicates_skipped", len(_scraped_data) - len(unique_listings))
+        self.metrics.observe("rows_per_page", len(_scraped_data))
+        if self.checkpoint is not None:
+            self.checkpoint.start_page(keyword, page, total_pages, len(unique_listings), duplicates)
+        if self.progress is not None:
+            self.progress.page_done(keyword, total_pages, len(_scraped_data))
+        self.enrichment.submit(unique_listings, tag=(keyword, page))
+
+    def on_listing_done(self, tag, row, result, failed=False):
+        if failed:
+            self.metrics.inc("rows_failed")
+        else:
+            self.metrics.inc("rows_written" if result is not None else "rows_without_abn")
+        if self.checkpoint is not None:
+            keyword, page = tag
+            self.checkpoint.row_done(keyword, page, result, failed)
+        if self.progress is not None:
+            self.progress.row_done(result)
+
     def save_to_csv(self):
-        for th in self.threads:
-            th.join()
-        df = pd.DataFrame(self.scraped_data)
-        filename = f"data/yellowpages_data_{self.timestamp}.csv"
-        df.to_csv(filename, index=False)
-        print(f"All data saved to {filename}")
-        self.browser.close()
+        self.enrichment.close()
+        self.sessions.close()
+        if self.abn_cache is not None:
+            for source, stats in self.abn_cache.stats().items():
+                log.info("ABN cache (%s): %s hits, %s misses, hit rate %.0f%%", source, stats['hits'],
+                         stats['misses'], stats['hit_rate'] * 100)
+        if self.abr_index is not None:
+            self.abr_index.close()
+        for host, stats in self.rate_limiter.stats().items():
+            log.info("Rate limit (%s): settled at %.2f requests/s, throttled %s times", host, stats['rate'],
+                     stats['throttled'])
+        snapshot = self.exporter.stop()
+        self.metrics.reset()
+        if self.abn_cache is not None:
+            self.abn_cache.close()
+        log.info("Finished in %.0f s at %.1f rows/s", snapshot["rates"]["uptime_seconds"],
+                 snapshot["rates"]["rows_per_second"])
+        self.results.close()
+        self.dedup.close()
+        log.info("Skipped %s duplicate listings across keywords (%s unique).", self.dedup.duplicates, self.dedup.unique)
+        filename = self.csv_writer.path
+        log.info("All data saved to %s (%s rows)", filename, len(self.results))
+        if self.checkpoint is not None:
+            failed_pages = self.checkpoint.failed_pages()
+            if failed_pages:
+                log.warning("%s pages failed or have listings that failed enrichment. Run again with the same "
+                            "keywords to retry them.", len(failed_pages))
+                self.checkpoint.close()
+            else:
+                self.checkpoint.finish()
+        if self.progress is not None:
+            self.progress.finish(filename)
+        if self.browser is not None:
+            self.browser.close()
         QApplication.instance().quit()
 
 
@@ -247,7 +501,7 @@ def get_from_yellow(keywords):
     businesses = abr_searcher.search_businesses(keywords)
     df = pd.DataFrame(businesses)
     keyword_list = df["Name"].tolist()
-    scraper = YellowPagesScraper(keywords=keyword_list)
+    scraper = YellowPagesScraper(keywords=keyword_list, keep_rows=True)
     scraper.run()
     scraper.hide()
     scraped_data = scraper.scraped_data
@@ -257,7 +511,7 @@ def get_from_yellow(keywords):
 
 def abn_lookup_tool(keyword_list):
     app = QApplication(sys.argv)
-    scraper = YellowPagesScraper(keywords=[keyword_list[0]])
+    scraper = YellowPagesScraper(keywords=[keyword_list[0]], keep_rows=True)
     scraper.run()
     # scraper.hide()
     app.quit()
@@ -266,13 +520,23 @@ def abn_lookup_tool(keyword_list):
 
 
 class Scraper(QThread):
-    def __init__(self, keywords):
+    def __init__(self, keywords, fetch_mode=FETCH_MODE_BROWSER, max_in_flight=MAX_IN_FLIGHT, max_per_host=MAX_PER_HOST,
+                 enrichment_workers=ENRICHMENT_WORKERS, progress=None, farm_workers=FARM_WORKERS):
         super().__init__()
         self.keywords = keywords
+        self.fetch_mode = fetch_mode
+        self.farm_workers = farm_workers
+        self.max_in_flight = max_in_flight
+        self.max_per_host = max_per_host
+        self.enrichment_workers = enrichment_workers
+        self.progress = progress
 
     def run(self):
         app = QApplication([])
-        scraper = YellowPagesScraper(keywords=self.keywords)
+        scraper = YellowPagesScraper(keywords=self.keywords, fetch_mode=self.fetch_mode,
+                                     max_in_flight=self.max_in_flight, max_per_host=self.max_per_host,
+                                     enrichment_workers=self.enrichment_workers, progress=self.progress,
+                                     farm_workers=self.farm_workers)
         scraper.run()
         scraper.hide()
         app.exec_()
@@ -0,0 +1,98 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+
+ABN_CACHE_PATH = os.path.join("data", "abn_cache.sqlite3")
+CACHE_TTL = 30 * 24 * 3600
+NEGATIVE_TTL = 7 * 24 * 3600
+MAX_ENTRIES = 500000
+EVICT_EVERY = 1000
+
+SOURCE_YELLOW = "yellow"
+SOURCE_ABR = "abr"
+
+MISSING = object()
+
+_non_word = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_name(name):
+    return _non_word.sub(" ", str(name or "").lower()).strip()
+
+
+def name_key(name, postcode):
+    return f"{normalize_name(name)}|{str(postcode or '').strip()}"
+
+
+class ABNCache:
+    def __init__(self, path=ABN_CACHE_PATH, ttl=CACHE_TTL, negative_ttl=NEGATIVE_TTL, max_entries=MAX_ENTRIES):
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.puts = 0
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS abn_cache ("
+            "source TEXT NOT NULL, key TEXT NOT NULL, abn TEXT, stored_at REAL NOT NULL, accessed_at REAL NOT NULL, "
+            "PRIMARY KEY (source, key))")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS abn_cache_accessed ON abn_cache (accessed_at)")
+        self.conn.commit()
+
+    def count(self, source, outcome):
+        counters = self.counters.setdefault(source, {"hits": 0, "misses": 0})
+        counters[outcome] += 1
+
+    def get(self, source, key):
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute("SELECT abn, stored_at FROM abn_cache WHERE source = ? AND key = ?",
+                                    (source, key)).fetchone()
+            if row is not None:
+                abn, stored_at = row
+                ttl = self.ttl if abn else self.negative_ttl
+                if now - stored_at <= ttl:
+                    self.conn.execute("UPDATE abn_cache SET accessed_at = ? WHERE source = ? AND key = ?",
+                                      (now, source, key))
+                    self.conn.commit()
+                    self.count(source, "hits")
+                    return abn
+            self.count(source, "misses")
+            return MISSING
+
+    def put(self, source, key, abn):
+        now = time.time()
+        with self.lock:
+            self.conn.execute("INSERT OR REPLACE INTO abn_cache (source, key, abn, stored_at, accessed_at) "
+                              "VALUES (?, ?, ?, ?, ?)", (source, key, abn or None, now, now))
+            self.puts += 1
+            if self.puts % EVICT_EVERY == 0:
+                self.evict()
+            self.conn.commit()
+
+    def evict(self):
+        total = self.conn.execute("SELECT COUNT(*) FROM abn_cache").fetchone()[0]
+        if total > self.max_entries:
+            self.conn.execute("DELETE FROM abn_cache WHERE rowid IN "
+                              "(SELECT rowid FROM abn_cache ORDER BY accessed_at LIMIT ?)", (total - self.max_entries,))
+
+    def stats(self):
+        with self.lock:
+            stats = {}
+            for source, counters in self.counters.items():
+                lookups = counters["hits"] + counters["misses"]
+                stats[source] = dict(counters, hit_rate=counters["hits"] / lookups if lookups else 0.0)
+            return stats
+
+    def close(self):
+        with self.lock:
+            self.evict()
+            self.conn.commit()
+            self.conn.close()
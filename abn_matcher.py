@@ -0,0 +1,82 @@
+import numpy as np
+
+from abn_cache import normalize_name
+
+MATCH_THRESHOLD = 0.35
+TOKEN_WEIGHT = 0.4
+POSTCODE_BOOST = 0.15
+STATE_BOOST = 0.05
+NGRAM_SIZE = 3
+
+
+def char_ngrams(text, n=NGRAM_SIZE):
+    padded = f" {text} "
+    if len(padded) <= n:
+        return {padded}
+    return {padded[i:i + n] for i in range(len(padded) - n + 1)}
+
+
+def name_tokens(text):
+    return set(text.split())
+
+
+def build_postings(feature_sets):
+    postings = {}
+    for index, features in enumerate(feature_sets):
+        for feature in features:
+            postings.setdefault(feature, []).append(index)
+    return {feature: np.array(indices, dtype=np.int64) for feature, indices in postings.items()}
+
+
+class CandidateIndex:
+    def __init__(self, candidates):
+        self.candidates = list(candidates)
+        names = [normalize_name(candidate.get("Name")) for candidate in self.candidates]
+        grams = [char_ngrams(name) if name else set() for name in names]
+        tokens = [name_tokens(name) for name in names]
+        self.gram_postings = build_postings(grams)
+        self.token_postings = build_postings(tokens)
+        self.gram_counts = np.array([len(g) for g in grams], dtype=np.float64)
+        self.token_counts = np.array([len(t) for t in tokens], dtype=np.float64)
+        self.postcodes = np.array([str(candidate.get("Postcode") or "").strip() for candidate in self.candidates])
+        self.states = np.array([str(candidate.get("State") or "").strip().upper() for candidate in self.candidates])
+        self.is_current = np.array([bool(candidate.get("IsCurrent")) for candidate in self.candidates])
+
+    def __len__(self):
+        return len(self.candidates)
+
+    def overlap(self, postings, features):
+        hits = [postings[feature] for feature in features if feature in postings]
+        if not hits:
+            return np.zeros(len(self.candidates), dtype=np.float64)
+        return np.bincount(np.concatenate(hits), minlength=len(self.candidates)).astype(np.float64)
+
+    def similarity(self, name):
+        query = normalize_name(name)
+        if not query or not self.candidates:
+            return np.zeros(len(self.candidates), dtype=np.float64)
+        query_grams = char_ngrams(query)
+        query_tokens = name_tokens(query)
+        gram_overlap = self.overlap(self.gram_postings, query_grams)
+        token_overlap = self.overlap(self.token_postings, query_tokens)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            gram_score = np.nan_to_num(2 * gram_overlap / (len(query_grams) + self.gram_counts))
+            token_score = np.nan_to_num(2 * token_overlap / (len(query_tokens) + self.token_counts))
+        return (1 - TOKEN_WEIGHT) * gram_score + TOKEN_WEIGHT * token_score
+
+    def best_match(self, name, postcode="", state="", threshold=MATCH_THRESHOLD):
+        if not self.candidates:
+            return None
+        similarity = self.similarity(name)
+        score = similarity.copy()
+        postcode = str(postcode or "").strip()
+        if postcode:
+            score += POSTCODE_BOOST * (self.postcodes == postcode)
+        state = str(state or "").strip().upper()
+        if state:
+            score += STATE_BOOST * (self.states == state)
+        eligible = np.flatnonzero(similarity >= threshold)
+        if not len(eligible):
+            return None
+        order = np.lexsort((eligible, ~self.is_current[eligible], -score[eligible]))
+        return self.candidates[eligible[order[0]]]
@@ -0,0 +1,210 @@
+import collections
+import os
+import sqlite3
+import sys
+import threading
+import xml.etree.ElementTree as ET
+
+from abn_cache import normalize_name
+
+ABR_INDEX_PATH = os.path.join("data", "abr_index.sqlite3")
+COMMIT_EVERY = 5000
+MAX_CANDIDATES = 50
+MAX_TOKEN_ROWS = 5000
+LEGAL_SUFFIXES = {"pty", "ltd", "limited", "proprietary", "inc", "incorporated", "the"}
+
+
+def index_key(name):
+    tokens = [token for token in normalize_name(name).split() if token not in LEGAL_SUFFIXES]
+    return " ".join(tokens)
+
+
+def element_text(element, path):
+    found = element.find(path)
+    if found is None or found.text is None:
+        return ""
+    return found.text.strip()
+
+
+def parse_abr_record(elem):
+    abn_el = elem.find("ABN")
+    if abn_el is None or not abn_el.text:
+        return None
+    entity = elem.find("MainEntity")
+    if entity is None:
+        entity = elem.find("LegalEntity")
+    names = []
+    state = postcode = ""
+    if entity is not None:
+        main_name = element_text(entity, "NonIndividualName/NonIndividualNameText")
+        if not main_name:
+            individual = entity.find("IndividualName")
+            if individual is not None:
+                parts = [given.text.strip() for given in individual.findall("GivenName") if given.text]
+                parts.append(element_text(individual, "FamilyName"))
+                main_name = " ".join(part for part in parts if part)
+        if main_name:
+            names.append(main_name)
+        state = element_text(entity, "BusinessAddress/AddressDetails/State")
+        postcode = element_text(entity, "BusinessAddress/AddressDetails/Postcode")
+    for other in elem.findall("OtherEntity/NonIndividualName"):
+        other_name = element_text(other, "NonIndividualNameText")
+        if other_name and other_name not in names:
+            names.append(other_name)
+    return {
+        "abn": abn_el.text.strip(),
+        "status": abn_el.get("status", ""),
+        "updated": elem.get("recordLastUpdatedDate", ""),
+        "state": state,
+        "postcode": postcode,
+        "names": names,
+    }
+
+
+def iter_abr_records(source):
+    context = ET.iterparse(source, events=("start", "end"))
+    root = None
+    for event, elem in context:
+        if event == "start":
+            if root is None:
+                root = elem
+            continue
+        if elem.tag == "ABR":
+            record = parse_abr_record(elem)
+            if record is not None:
+                yield record
+            root.clear()
+
+
+class ABRIndex:
+    def __init__(self, path=ABR_INDEX_PATH):
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS entities ("
+            "abn TEXT PRIMARY KEY, status TEXT, updated TEXT, state TEXT, postcode TEXT, name TEXT)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS names (abn TEXT NOT NULL, name TEXT NOT NULL, key TEXT NOT NULL)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS names_key ON names (key)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS names_abn ON names (abn)")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS name_tokens (abn TEXT NOT NULL, name TEXT NOT NULL, token TEXT NOT NULL, "
+            "state TEXT, postcode TEXT, status TEXT)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS name_tokens_state ON name_tokens (token, state)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS name_tokens_postcode ON name_tokens (token, postcode)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS name_tokens_abn ON name_tokens (abn)")
+        self.conn.commit()
+
+    def ingest(self, source):
+        stats = {"read": 0, "inserted": 0, "updated": 0, "unchanged": 0}
+        with self.lock:
+            for record in iter_abr_records(source):
+                stats["read"] += 1
+                row = self.conn.execute("SELECT updated FROM entities WHERE abn = ?", (record["abn"],)).fetchone()
+                if row is not None and row[0] >= record["updated"]:
+                    stats["unchanged"] += 1
+                    continue
+                stats["inserted" if row is None else "updated"] += 1
+                self.store(record)
+                if stats["read"] % COMMIT_EVERY == 0:
+                    self.conn.commit()
+            self.conn.commit()
+        return stats
+
+    def store(self, record):
+        main_name = record["names"][0] if record["names"] else ""
+        self.conn.execute("INSERT OR REPLACE INTO entities (abn, status, updated, state, postcode, name) "
+                          "VALUES (?, ?, ?, ?, ?, ?)",
+                          (record["abn"], record["status"], record["updated"], record["state"], record["postcode"],
+                           main_name))
+        self.conn.execute("DELETE FROM names WHERE abn = ?", (record["abn"],))
+        self.conn.executemany("INSERT INTO names (abn, name, key) VALUES (?, ?, ?)",
+                              [(record["abn"], name, index_key(name)) for name in record["names"] if index_key(name)])
+        self.conn.execute("DELETE FROM name_tokens WHERE abn = ?", (record["abn"],))
+        self.conn.executemany("INSERT INTO name_tokens (abn, name, token, state, postcode, status) "
+                              "VALUES (?, ?, ?, ?, ?, ?)",
+                              [(record["abn"], name, token, record["state"], record["postcode"], record["status"])
+                               for name in record["names"] for token in set(index_key(name).split())])
+
+    def candidates(self, name, postcode="", state="", limit=MAX_CANDIDATES):
+        key = index_key(name)
+        if not key:
+            return []
+        postcode = str(postcode or "")
+        state = str(state or "")
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT e.abn, n.name, e.state, e.postcode, e.status FROM names n JOIN entities e ON e.abn = n.abn "
+                "WHERE n.key = ? ORDER BY (e.postcode = ?) DESC, (e.state = ?) DESC, (e.status = 'ACT') DESC, e.abn "
+                "LIMIT ?", (key, postcode, state, limit)).fetchall()
+            if len(rows) < limit:
+                rows += self.token_candidates(key.split(), postcode, state, limit, exclude=rows)
+        return [{
+            'ABN': abn,
+            'Name': business_name,
+            'State': business_state,
+            'Postcode': business_postcode,
+            'IsCurrent': status == 'ACT'
+        } for abn, business_name, business_state, business_postcode, status in rows]
+
+    def token_candidates(self, tokens, postcode, state, limit, exclude=()):
+        # Names sharing the most tokens with the query. Each token is read from its own index range, narrowed to the
+        # listing's state (or postcode) and capped at MAX_TOKEN_ROWS, so a lookup costs the same on a full bulk
+        # extract as on a small one. Tokens too common to fit under the cap ("services", "plumbing") are skipped
+        # unless the query has nothing rarer.
+        if state:
+            narrow, params = " AND state = ?", (state,)
+        elif postcode:
+            narrow, params = " AND postcode = ?", (postcode,)
+        else:
+            narrow, params = "", ()
+        counts = {}
+        for token in set(tokens):
+            counts[token] = self.conn.execute(
+                f"SELECT COUNT(*) FROM (SELECT 1 FROM name_tokens WHERE token = ?{narrow} LIMIT ?)",
+                (token, *params, MAX_TOKEN_ROWS + 1)).fetchone()[0]
+        ranked = sorted((count, token) for token, count in counts.items() if count)
+        selective = [token for count, token in ranked if count <= MAX_TOKEN_ROWS] or [token for _, token in ranked[:1]]
+        seen = {(abn, business_name) for abn, business_name, *_ in exclude}
+        shared = collections.Counter()
+        rows = {}
+        for token in selective:
+            for row in self.conn.execute(
+                    f"SELECT abn, name, state, postcode, status FROM name_tokens WHERE token = ?{narrow} LIMIT ?",
+                    (token, *params, MAX_TOKEN_ROWS)):
+                if (row[0], row[1]) not in seen:
+                    shared[row[0], row[1]] += 1
+                    rows[row[0], row[1]] = row
+        best = sorted(shared, key=lambda key: (-shared[key], rows[key][3] != postcode, rows[key][4] != 'ACT', key))
+        return [rows[key] for key in best[:limit - len(seen)]]
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM entities").fetchone()[0]
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+def ingest_files(paths, index_path=ABR_INDEX_PATH):
+    index = ABRIndex(index_path)
+    try:
+        for path in paths:
+            stats = index.ingest(path)
+            print(f"{path}: {stats['read']} records, {stats['inserted']} new, {stats['updated']} updated, "
+                  f"{stats['unchanged']} unchanged")
+        print(f"Index {index_path} now holds {len(index)} ABNs")
+    finally:
+        index.close()
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print("Usage: python abr_index.py <bulk extract xml> [<bulk extract xml> ...]")
+        sys.exit(1)
+    ingest_files(sys.argv[1:])
@@ -0,0 +1,145 @@
+import collections
+import hashlib
+import os
+import pickle
+import threading
+
+import pandas as pd
+
+ANALYSIS_CACHE_DIR = os.path.join("data", "analysis_cache")
+MEMORY_ITEMS = 64
+DISK_BYTES = 512 * 1024 * 1024
+MEMO_ITEMS = 1000000
+
+
+def frame_hash(data):
+    digest = hashlib.sha1()
+    if isinstance(data, pd.DataFrame):
+        digest.update(repr(list(data.columns)).encode("utf-8"))
+    digest.update(pd.util.hash_pandas_object(data, index=True).values.tobytes())
+    return digest.hexdigest()
+
+
+def stage_key(stage, data_hash, params):
+    return hashlib.sha1(repr((stage, data_hash, sorted(params.items()))).encode("utf-8")).hexdigest()
+
+
+class AnalysisCache:
+    def __init__(self, directory=ANALYSIS_CACHE_DIR, memory_items=MEMORY_ITEMS, disk_bytes=DISK_BYTES,
+                 memo_items=MEMO_ITEMS):
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        self.directory = directory
+        self.memory_items = memory_items
+        self.disk_bytes = disk_bytes
+        self.memo_items = memo_items
+        self.memory = collections.OrderedDict()
+        self.memos = {}
+        self.dirty_memos = set()
+        self.lock = threading.RLock()
+
+    def path(self, name):
+        return os.path.join(self.directory, f"{name}.pkl")
+
+    def get(self, key, default=None):
+        with self.lock:
+            if key in self.memory:
+                self.memory.move_to_end(key)
+                return self.memory[key]
+            path = self.path(key)
+            if os.path.exists(path):
+                try:
+                    with open(path, "rb") as f:
+                        value = pickle.load(f)
+                except (OSError, pickle.UnpicklingError, EOFError):
+                    return default
+                os.utime(path)
+                self.remember(key, value)
+                return value
+            return default
+
+    def put(self, key, value):
+        with self.lock:
+            self.remember(key, value)
+            self.dump(self.path(key), value)
+            self.evict_disk()
+
+    def remember(self, key, value):
+        self.memory[key] = value
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_items:
+            self.memory.popitem(last=False)
+
+    def dump(self, path, value):
+        partial_path = path + ".tmp"
+        with open(partial_path, "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(partial_path, path)
+
+    def evict_disk(self):
+        entries = []
+        total = 0
+        for name in os.listdir(self.directory):
+            if not name.endswith(".pkl"):
+                continue
+            stat = os.stat(os.path.join(self.directory, name))
+            entries.append((stat.st_mtime, stat.st_size, name))
+            total += stat.st_size
+        for _, size, name in sorted(entries):
+            if total <= self.disk_bytes:
+                break
+            os.remove(os.path.join(self.directory, name))
+            self.memos.pop(name[:-len(".pkl")], None)
+            total -= size
+
+    def stage(self, stage, data, compute, **params):
+        data_hash = data if isinstance(data, str) else frame_hash(data)
+        key = stage_key(stage, data_hash, params)
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def memo(self, stage):
+        name = f"memo-{stage}"
+        if name not in self.memos:
+            self.memos[name] = self.get(name) or {}
+        return name, self.memos[name]
+
+    def map_texts(self, stage, series, func, batch=False):
+        hashes = pd.util.hash_pandas_object(series, index=False).values
+        with self.lock:
+            name, memo = self.memo(stage)
+            missing = {}
+            for text_hash, text in zip(hashes, series.values):
+                if text_hash not in memo and text_hash not in missing:
+                    missing[text_hash] = text
+        if missing:
+            if batch:
+                results = dict(zip(missing.keys(), func(list(missing.values()))))
+            else:
+                results = {text_hash: func(text) for text_hash, text in missing.items()}
+            with self.lock:
+                memo.update(results)
+                while len(memo) > self.memo_items:
+                    del memo[next(iter(memo))]
+                self.dirty_memos.add(name)
+        return pd.Series([memo[text_hash] for text_hash in hashes], index=series.index)
+
+    def flush(self):
+        with self.lock:
+            for name in self.dirty_memos:
+                self.put(name, self.memos[name])
+            self.dirty_memos = set()
+
+
+_cache = None
+
+
+def get_cache():
+    global _cache
+    if _cache is None:
+        _cache = AnalysisCache()
+    return _cache
@@ -0,0 +1,54 @@
+import json
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+from initial_state import extract_initial_state
+
+
+def legacy_extract(html_content):
+    soup = BeautifulSoup(html_content, 'html.parser')
+    pattern = re.compile(r"window\.__INITIAL_STATE__ = ({.*?});", re.MULTILINE | re.DOTALL)
+    script_tag = soup.find("script", text=pattern)
+    if not script_tag:
+        return None
+    match = pattern.search(script_tag.string)
+    return json.loads(match.group(1))
+
+
+def build_page(listings=35, filler_kb=400):
+    views = []
+    for i in range(listings):
+        views.append({
+            "name": f"Business {i}",
+            "longDescriptor": "Quality work, no job too small",
+            "addressView": {"asContactCardFormat": f"{i} George St, Sydney NSW 2000", "postCode": "2000",
+                            "state": "NSW", "suburb": "Sydney"},
+            "callContactNumber": {"displayValue": "(02) 9000 0000"},
+            "category": {"name": "Chemical Manufacturers"},
+            "detailsLink": f"https://www.yellowpages.com.au/nsw/sydney/business-{i}",
+        })
+    state = {"model": {"inAreaResultViews": views, "pagination": {"totalResults": 120}}}
+    filler = "<div class=\"listing\">" + "x" * 1000 + "</div>\n"
+    return ("<html><head><script src=\"/app.js\"></script></head><body>"
+            + filler * filler_kb
+            + "<script>window.__INITIAL_STATE__ = " + json.dumps(state) + ";</script>"
+            + "</body></html>")
+
+
+def main(number=20):
+    html_content = build_page()
+    assert legacy_extract(html_content) == extract_initial_state(html_content)
+    print(f"Page size: {len(html_content) / 1024:.0f} KiB")
+    for name, func in (("legacy (BeautifulSoup + regex)", legacy_extract),
+                       ("initial_state.extract_initial_state", extract_initial_state)):
+        seconds = timeit.timeit(lambda: func(html_content), number=number) / number
+        print(f"{name:40s} {seconds * 1000:9.2f} ms/page")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+import ast
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENTRY_POINTS = ("proj.py", "Main11.py")
+
+
+def top_level_imports(path):
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), path)
+    return "\n".join(ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom)))
+
+
+def parse_importtime(stderr):
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not name.startswith("  "):
+            modules.append((int(cumulative), name.strip()))
+    return sorted(modules, reverse=True)
+
+
+def measure(code, runs):
+    best = None
+    modules = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT, capture_output=True,
+                                text=True)
+        seconds = time.perf_counter() - start
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip().splitlines()[-1])
+        if best is None or seconds < best:
+            best = seconds
+            modules = parse_importtime(result.stderr)
+    return best, modules
+
+
+def main(runs=5, top=8):
+    baseline, _ = measure("pass", runs)
+    print(f"{'interpreter start':40s} {baseline * 1000:9.1f} ms")
+    for entry_point in ENTRY_POINTS:
+        code = top_level_imports(os.path.join(ROOT, entry_point))
+        try:
+            seconds, modules = measure(code, runs)
+        except RuntimeError as e:
+            print(f"{entry_point:40s} failed: {e}")
+            continue
+        print(f"{entry_point + ' imports':40s} {(seconds - baseline) * 1000:9.1f} ms")
+        for cumulative, name in modules[:top]:
+            print(f"    {name:36s} {cumulative / 1000:9.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
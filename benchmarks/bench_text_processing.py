@@ -0,0 +1,56 @@
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+from nltk.corpus import stopwords
+from nltk.tokenize import word_tokenize
+from text_processing import preprocess_texts
+
+
+def legacy_preprocess_text(text):
+    if not pd.isna(text):
+        tokens = word_tokenize(text.lower())
+        tokens = [word for word in tokens if word not in string.punctuation]
+        tokens = [word for word in tokens if word not in stopwords.words('english')]
+        return " ".join(tokens)
+    else:
+        return ""
+
+
+def build_texts(rows=20000, seed=7):
+    rng = random.Random(seed)
+    vocabulary = ["Quality", "work", "no", "job", "too", "small", "the", "best", "in", "Sydney", "and", "all",
+                  "of", "NSW", "chemical", "supplies", "(24/7)", "service!", "we're", "family-owned", "since", "1985."]
+    texts = []
+    for _ in range(rows):
+        if rng.random() < 0.05:
+            texts.append(np.nan)
+        else:
+            texts.append(" ".join(rng.choice(vocabulary) for _ in range(rng.randint(5, 40))))
+    return pd.Series(texts)
+
+
+def main(rows=20000, legacy_rows=2000):
+    texts = build_texts(rows)
+    sample = texts[:legacy_rows]
+    assert list(sample.apply(legacy_preprocess_text)) == preprocess_texts(sample)
+    start = time.perf_counter()
+    sample.apply(legacy_preprocess_text)
+    legacy_rate = legacy_rows / (time.perf_counter() - start)
+    print(f"{'legacy preprocess_text (apply)':40s} {legacy_rate:12.0f} rows/sec ({legacy_rows} rows)")
+    for name, kwargs in (("text_processing (single process)", {"min_parallel_rows": rows + 1}),
+                         ("text_processing (process pool)", {"min_parallel_rows": 0})):
+        start = time.perf_counter()
+        preprocess_texts(texts, **kwargs)
+        rate = rows / (time.perf_counter() - start)
+        print(f"{name:40s} {rate:12.0f} rows/sec ({rows} rows)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+import json
+import random
+from xml.sax.saxutils import escape
+
+SUBURBS = [("Sydney", "2000"), ("Parramatta", "2150"), ("Newcastle", "2300"), ("Wollongong", "2500"),
+           ("Penrith", "2750"), ("Liverpool", "2170"), ("Gosford", "2250"), ("Dubbo", "2830")]
+WORDS = ["Quality", "chemical", "supplies", "industrial", "solvents", "manufacturing", "family-owned", "since",
+         "1985", "trusted", "service", "across", "NSW", "fast", "delivery", "bulk", "orders", "welcome"]
+BOILERPLATE = "Quality work, no job too small. Servicing all of NSW."
+
+
+def business_name(keyword, index):
+    return f"{keyword.title()} {['Pty Ltd', 'Co', 'Group', 'Supplies', 'Holdings'][index % 5]} {index}"
+
+
+def abn_for(index):
+    return f"{51 + index % 40} {index:03d} {index * 7 % 1000:03d} {index * 13 % 1000:03d}"
+
+
+def listing_view(base_url, keyword, index, rng):
+    suburb, postcode = SUBURBS[index % len(SUBURBS)]
+    description = BOILERPLATE if index % 3 == 0 else " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 30)))
+    view = {
+        "name": business_name(keyword, index),
+        "longDescriptor": description,
+        "addressView": {"asContactCardFormat": f"{index} George St, {suburb} NSW {postcode}", "postCode": postcode,
+                        "state": "NSW", "suburb": suburb},
+        "callContactNumber": {"displayValue": f"(02) 9{index % 1000:03d} {index % 10000:04d}"},
+        "category": {"name": keyword.title()},
+        "primaryEmail": f"info@business{index}.com.au" if index % 4 else "",
+        "detailsLink": f"{base_url}/nsw/{suburb.lower()}/business-{index}",
+        "searchableAddress": {"latitude": -33.8 - index % 50 / 100, "longitude": 151.2 + index % 50 / 100},
+        "averageRatings": {"yellowReviewSummary": None},
+    }
+    if index % 2:
+        view["averageRatings"] = {"yellowReviewSummary": {"featuredReview": {
+            "reviewText": " ".join(rng.choice(WORDS) for _ in range(rng.randint(10, 40)))}}}
+    return view
+
+
+def search_state(base_url, keyword, page, total_results, page_size=35, seed=0):
+    rng = random.Random(f"{seed}-{keyword}-{page}")
+    first = (page - 1) * page_size
+    count = max(0, min(page_size, total_results - first))
+    views = [listing_view(base_url, keyword, first + offset, rng) for offset in range(count)]
+    return {"model": {"inAreaResultViews": views, "pagination": {"totalResults": total_results}}}
+
+
+def search_page(state, filler_kb=300):
+    filler = "<div class=\"listing\">" + "x" * 1000 + "</div>\n"
+    return ("<html><head><script src=\"/app.js\"></script></head><body>"
+            + filler * filler_kb
+            + "<script>window.__INITIAL_STATE__ = " + json.dumps(state) + ";</script>"
+            + "</body></html>")
+
+
+def detail_page(index, with_abn=True):
+    abn = f"<dl><dt>ABN</dt><dd class=\"abn\">{abn_for(index)}</dd></dl>" if with_abn else ""
+    return (f"<html><body><h1>Business {index}</h1>"
+            + "<p>" + "Opening hours and service areas. " * 200 + "</p>"
+            + abn + "</body></html>")
+
+
+def abr_record(name, postcode, index):
+    return ("<searchResultsRecord>"
+            f"<ABN><identifierValue>{abn_for(index)}</identifierValue><identifierStatus>Active</identifierStatus></ABN>"
+            f"<mainName><organisationName>{escape(name)}</organisationName><score>100</score></mainName>"
+            "<mainBusinessPhysicalAddress><stateCode>NSW</stateCode>"
+            f"<postcode>{postcode}</postcode><isCurrentIndicator>Y</isCurrentIndicator>"
+            "</mainBusinessPhysicalAddress></searchResultsRecord>")
+
+
+def abr_response(name, postcode, records=20, seed=0):
+    rng = random.Random(f"{seed}-{name}")
+    results = [abr_record(name, postcode or "2000", rng.randint(0, 99999))]
+    for i in range(records - 1):
+        other = f"{name.split()[0]} {rng.choice(WORDS).title()} {rng.choice(WORDS).title()} {i}"
+        results.append(abr_record(other, rng.choice(SUBURBS)[1], rng.randint(0, 99999)))
+    return ("<?xml version=\"1.0\" encoding=\"utf-8\"?>"
+            "<ABRPayloadSearchResults xmlns=\"http://abr.business.gov.au/ABRXMLSearch/\"><response>"
+            f"<searchResultsList><numberOfRecords>{records}</numberOfRecords>{''.join(results)}</searchResultsList>"
+            "</response></ABRPayloadSearchResults>")
@@ -0,0 +1,312 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import xmltodict
+from bs4 import BeautifulSoup
+
+import rate_limiter
+from fixtures import abr_response, detail_page, search_page, search_state
+from stub_server import StubServer
+
+KEYWORDS = ("acid", "solvent", "resin")
+REGRESSION_THRESHOLD = 0.1
+
+_app = None
+
+
+class Skipped(Exception):
+    pass
+
+
+def throughput(func, items, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for item in items:
+            func(item)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return len(items) / best
+
+
+def result(name, value, unit, **extra):
+    return {"name": name, "value": round(value, 3), "unit": unit, "status": "ok", "extra": extra}
+
+
+def qt_app():
+    global _app
+    try:
+        from PyQt5.QtWidgets import QApplication
+    except ImportError as e:
+        raise Skipped(str(e))
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    if _app is None:
+        _app = QApplication.instance() or QApplication([])
+    return _app
+
+
+def scraper_module(server):
+    qt_app()
+    import YellowPagesScraper
+    YellowPagesScraper.SEARCH_URL = server.search_url
+    YellowPagesScraper.ABR_SEARCH_URL = server.abr_url
+    return YellowPagesScraper
+
+
+def fixture_listings(server, rows):
+    from listing_parser import parse_listings
+    listings = []
+    page = 1
+    while len(listings) < rows:
+        listings.extend(parse_listings(search_state(server.base_url, "acid", page, rows)))
+        page += 1
+    return listings[:rows]
+
+
+def fixture_texts(server, rows):
+    texts = []
+    for listing in fixture_listings(server, rows):
+        texts.append(listing.get("description") or "")
+    return texts
+
+
+def bench_state_extraction(server, args):
+    from initial_state import extract_initial_state
+    pages = [search_page(search_state(server.base_url, keyword, 1, 35), server.filler_kb) for keyword in KEYWORDS]
+    rate = throughput(extract_initial_state, pages * 5)
+    megabytes = sum(len(page) for page in pages) / len(pages) / 1e6
+    return [result("state_extraction", rate, "pages/s", page_mb=round(megabytes, 2)),
+            result("state_extraction_bandwidth", rate * megabytes, "MB/s")]
+
+
+def bench_listing_parse(server, args):
+    from listing_parser import parse_listings
+    states = [search_state(server.base_url, keyword, page, 35 * 4) for keyword in KEYWORDS for page in range(1, 5)]
+    rate = throughput(parse_listings, states)
+    return [result("listing_parse", rate * 35, "listings/s")]
+
+
+def bench_detail_abn(server, args):
+    pages = [detail_page(index) for index in range(50)]
+    rate = throughput(lambda page: BeautifulSoup(page, 'html.parser').find("dd", class_="abn").text, pages)
+    return [result("detail_abn_parse", rate, "pages/s")]
+
+
+def bench_abr_matching(server, args):
+    from abn_matcher import CandidateIndex
+    queries = [(f"Acid Co {index}", "2000") for index in range(100)]
+    responses = [abr_response(name, postcode, records=args.abr_records) for name, postcode in queries]
+
+    def match(response_xml):
+        records = xmltodict.parse(response_xml)['ABRPayloadSearchResults']['response']['searchResultsList']
+        candidates = [{
+            'ABN': record['ABN']['identifierValue'],
+            'Name': record['mainName']['organisationName'],
+            'State': record['mainBusinessPhysicalAddress']['stateCode'],
+            'Postcode': record['mainBusinessPhysicalAddress']['postcode'],
+            'IsCurrent': record['mainBusinessPhysicalAddress']['isCurrentIndicator'] == 'Y',
+        } for record in records['searchResultsRecord']]
+        return CandidateIndex(candidates).best_match("Acid Co 1", "2000", "NSW")
+
+    return [result("abr_matching", throughput(match, responses), "responses/s", records=args.abr_records)]
+
+
+def bench_text_processing(server, args):
+    try:
+        from text_processing import preprocess_texts
+        import pandas as pd
+        preprocess_texts(pd.Series(["warm up"]))
+    except (ImportError, LookupError) as e:
+        raise Skipped(str(e))
+    texts = pd.Series(fixture_texts(server, args.text_rows))
+    start = time.perf_counter()
+    preprocess_texts(texts)
+    return [result("preprocess_text", len(texts) / (time.perf_counter() - start), "texts/s", rows=len(texts))]
+
+
+def bench_sentiment(server, args):
+    try:
+        from sentiment import score_texts
+        score_texts(["warm up"])
+    except ImportError as e:
+        raise Skipped(str(e))
+    texts = fixture_texts(server, args.text_rows)
+    start = time.perf_counter()
+    score_texts(texts)
+    return [result("sentiment", len(texts) / (time.perf_counter() - start), "texts/s", rows=len(texts))]
+
+
+def bench_crawl(server, args):
+    from crawl_scheduler import CrawlScheduler
+    from page_fetcher import count_pages, fetch_initial_state
+    pages = []
+    requests_before = server.requests
+    scheduler = CrawlScheduler(
+        url_for=lambda keyword, page: server.search_url.format(keyword=keyword, location="New+South+Wales", page=page),
+        fetch=fetch_initial_state,
+        page_count=lambda state: count_pages(state["model"]["pagination"], server.total_results),
+        on_page=lambda keyword, page, state: pages.append(state is not None),
+        max_in_flight=args.max_in_flight)
+    start = time.perf_counter()
+    scheduler.crawl(list(KEYWORDS))
+    elapsed = time.perf_counter() - start
+    return [result("crawl_http", len(pages) / elapsed, "pages/s", pages=len(pages), failed=pages.count(False),
+                   requests=server.requests - requests_before)]
+
+
+def bench_abr_search(server, args):
+    module = scraper_module(server)
+    searcher = module.ABRSearcher("benchmark", rate_limiter=rate_limiter.get_rate_limiter())
+    queries = [(f"Resin Group {index}", "2150") for index in range(args.abr_queries)]
+    start = time.perf_counter()
+    found = sum(1 for name, postcode in queries if searcher.search_businesses(name, postcode, state="NSW"))
+    elapsed = time.perf_counter() - start
+    return [result("abr_search", len(queries) / elapsed, "queries/s", matched=found)]
+
+
+def bench_enrichment(server, args):
+    module = scraper_module(server)
+    from page_fetcher import FETCH_MODE_HTTP
+    scraper = module.YellowPagesScraper([], fetch_mode=FETCH_MODE_HTTP, abn_cache_path=None, abr_index_path=None,
+                                        resume=False)
+    listings = fixture_listings(server, args.enrich_rows)
+    try:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=module.ENRICHMENT_WORKERS) as executor:
+            enriched = [row for row in executor.map(scraper.enrich_listing, listings) if row is not None]
+        elapsed = time.perf_counter() - start
+    finally:
+        scraper.exporter.stop()
+        scraper.enrichment.close()
+        scraper.sessions.close()
+        scraper.results.close()
+        scraper.dedup.close()
+    return [result("enrichment", len(listings) / elapsed, "listings/s", enriched=len(enriched))]
+
+
+def bench_end_to_end(server, args):
+    module = scraper_module(server)
+    from page_fetcher import FETCH_MODE_HTTP
+    app = qt_app()
+    scraper = module.YellowPagesScraper(list(KEYWORDS), fetch_mode=FETCH_MODE_HTTP, max_in_flight=args.max_in_flight,
+                                        abn_cache_path=None, abr_index_path=None, resume=False)
+    start = time.perf_counter()
+    scraper.run()
+    app.exec_()
+    elapsed = time.perf_counter() - start
+    rows = len(scraper.results)
+    return [result("end_to_end", rows / elapsed, "rows/s", rows=rows, seconds=round(elapsed, 2))]
+
+
+BENCHMARKS = (bench_state_extraction, bench_listing_parse, bench_detail_abn, bench_abr_matching,
+              bench_text_processing, bench_sentiment, bench_crawl, bench_abr_search, bench_enrichment,
+              bench_end_to_end)
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    selected = [bench for bench in BENCHMARKS if not args.only or bench.__name__[6:] in args.only]
+    if not args.paced:
+        # Benchmark the pipeline rather than the politeness delays used against the real sites.
+        rate_limiter._rate_limiter = rate_limiter.RateLimiter(rate=1000.0, max_rate=1000.0, burst=100,
+                                                              backoff_base=0.01, backoff_cap=0.05)
+    results = []
+    workdir = tempfile.mkdtemp(prefix="whs-bench-")
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        with StubServer(latency=args.latency, error_rate=args.error_rate, total_results=args.results,
+                        seed=args.seed) as server:
+            for bench in selected:
+                name = bench.__name__[6:]
+                print(f"Running {name}...", file=sys.stderr)
+                try:
+                    results.extend(bench(server, args))
+                except Skipped as e:
+                    results.append({"name": name, "value": None, "unit": None, "status": "skipped",
+                                    "reason": str(e)})
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+    return {
+        "revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {"latency": args.latency, "error_rate": args.error_rate, "results": args.results,
+                   "seed": args.seed, "paced": args.paced, "max_in_flight": args.max_in_flight},
+        "results": results,
+    }
+
+
+def compare(report, baseline, threshold=REGRESSION_THRESHOLD):
+    previous = {entry["name"]: entry for entry in baseline["results"] if entry["status"] == "ok"}
+    regressions = []
+    print(f"{'benchmark':<28}{'baseline':>14}{'current':>14}{'ratio':>9}")
+    for entry in report["results"]:
+        before = previous.get(entry["name"])
+        if entry["status"] != "ok" or before is None or not before["value"]:
+            continue
+        ratio = entry["value"] / before["value"]
+        flag = ""
+        if ratio < 1 - threshold:
+            flag = "  REGRESSION"
+            regressions.append(entry["name"])
+        print(f"{entry['name']:<28}{before['value']:>14.1f}{entry['value']:>14.1f}{ratio:>8.2f}x{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmarks against recorded fixtures and a local stub server.")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", help="Baseline results file to compare against.")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    parser.add_argument("--only", nargs="*", help="Benchmarks to run, e.g. crawl end_to_end.")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds the stub server waits per request.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with 429/503.")
+    parser.add_argument("--results", type=int, default=140, help="Listings per keyword served by the stub.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-in-flight", type=int, default=8)
+    parser.add_argument("--text-rows", type=int, default=5000)
+    parser.add_argument("--abr-records", type=int, default=50)
+    parser.add_argument("--abr-queries", type=int, default=50)
+    parser.add_argument("--enrich-rows", type=int, default=100)
+    parser.add_argument("--paced", action="store_true", help="Keep the default per-host rate limits.")
+    args = parser.parse_args()
+
+    report = run(args)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    for entry in report["results"]:
+        if entry["status"] == "ok":
+            print(f"{entry['name']:<28}{entry['value']:>14.1f} {entry['unit']}")
+        else:
+            print(f"{entry['name']:<28}{'skipped':>14} ({entry['reason']})")
+    print(f"Results written to {args.output}")
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(report, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from fixtures import abr_response, detail_page, search_page, search_state
+
+SEARCH_PATH = "/search/listings"
+ABR_PATH = "/abrxmlsearch/AbrXmlSearch.asmx/ABRSearchByNameAdvancedSimpleProtocol"
+
+_detail_path = re.compile(r"^/nsw/[^/]+/business-(\d+)$")
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        server.count_request()
+        if server.latency:
+            time.sleep(server.latency)
+        if server.inject_error():
+            self.send_body(503 if server.random.random() < 0.5 else 429, "busy", headers={"Retry-After": "0"})
+            return
+        parts = urlsplit(self.path)
+        query = {key: values[0] for key, values in parse_qs(parts.query).items()}
+        detail = _detail_path.match(parts.path)
+        if parts.path == SEARCH_PATH:
+            page = int(query.get("pageNumber") or 1)
+            state = search_state(server.base_url, query.get("clue", ""), page, server.total_results)
+            self.send_body(200, search_page(state, server.filler_kb))
+        elif detail:
+            index = int(detail.group(1))
+            self.send_body(200, detail_page(index, with_abn=index % server.abr_fallback_every != 0))
+        elif parts.path == ABR_PATH:
+            self.send_body(200, abr_response(query.get("name", ""), query.get("postcode", "")),
+                           content_type="text/xml; charset=utf-8")
+        else:
+            self.send_body(404, "not found")
+
+    def send_body(self, status, body, content_type="text/html; charset=utf-8", headers=None):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, latency=0.0, error_rate=0.0, total_results=140, filler_kb=300, abr_fallback_every=2, seed=0):
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.total_results = total_results
+        self.filler_kb = filler_kb
+        self.abr_fallback_every = abr_fallback_every
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.base_url = f"http://127.0.0.1:{self.server_address[1]}"
+        self.search_url = self.base_url + SEARCH_PATH + "?clue={keyword}&locationClue={location}&pageNumber={page}"
+        self.abr_url = self.base_url + ABR_PATH
+        self.thread = None
+
+    def count_request(self):
+        with self.lock:
+            self.requests += 1
+
+    def inject_error(self):
+        with self.lock:
+            return self.error_rate and self.random.random() < self.error_rate
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,215 @@
+import collections
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing.connection import wait
+
+from metrics import get_metrics
+from rate_limiter import get_rate_limiter
+
+FARM_WORKERS = os.cpu_count() or 1
+PAGE_TIMEOUT = 90
+MAX_ATTEMPTS = 3
+POLL_INTERVAL = 0.1
+
+log = logging.getLogger(__name__)
+
+
+def run_worker(worker_id, inbox, results, parse):
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5.QtCore import QTimer
+    from PyQt5.QtWidgets import QApplication
+    from PyQt5.QtWebEngineWidgets import QWebEngineView
+    from page_loader import PageStateLoader
+
+    app = QApplication([])
+    browser = QWebEngineView()
+    current = {"job_id": None}
+
+    def next_job():
+        job = inbox.get()
+        if job is None:
+            app.quit()
+            return
+        current["job_id"], url = job
+        loader.load(url)
+
+    def on_state(json_data):
+        job_id, current["job_id"] = current["job_id"], None
+        if job_id is None:
+            return
+        payload = None
+        try:
+            if json_data is not None:
+                payload = parse(json_data) if parse is not None else json_data
+        except Exception as e:
+            log.warning("Browser worker %s could not parse page: %s", worker_id, e)
+        results.send((job_id, payload))
+        QTimer.singleShot(0, next_job)
+
+    loader = PageStateLoader(browser, on_state)
+    QTimer.singleShot(0, next_job)
+    app.exec_()
+
+
+class BrowserWorker:
+    def __init__(self, worker_id, context, parse):
+        self.worker_id = worker_id
+        self.inbox = context.Queue()
+        # A pipe per worker: killing a hung worker mid-send can only corrupt its own channel, never the others'.
+        self.results, writer = context.Pipe(duplex=False)
+        self.process = context.Process(target=run_worker, args=(worker_id, self.inbox, writer, parse), daemon=True)
+        self.process.start()
+        writer.close()
+        self.job_id = None
+        self.started = None
+
+    def close(self):
+        self.results.close()
+
+
+class BrowserFarm:
+    def __init__(self, workers=FARM_WORKERS, parse=None, page_timeout=PAGE_TIMEOUT, max_attempts=MAX_ATTEMPTS,
+                 rate_limiter=None):
+        self.workers = max(1, workers)
+        self.rate_limiter = rate_limiter or get_rate_limiter()
+        self.parse = parse
+        self.page_timeout = page_timeout
+        self.max_attempts = max_attempts
+        self.context = multiprocessing.get_context("spawn")
+        self.pool = []
+        self.pending = collections.deque()
+        self.jobs = {}
+        self.next_job_id = 0
+        self.restarts = 0
+        self.lock = threading.Lock()
+        self.closed = threading.Event()
+        self.collector = None
+
+    def start(self):
+        self.pool = [BrowserWorker(worker_id, self.context, self.parse)
+                     for worker_id in range(self.workers)]
+        self.collector = threading.Thread(target=self.collect, daemon=True)
+        self.collector.start()
+        get_metrics().add_collector(self.collect_metrics)
+        return self
+
+    def collect_metrics(self):
+        with self.lock:
+            busy = sum(1 for worker in self.pool if worker.job_id is not None)
+            yield "queue_depth", len(self.pending), {"queue": "browser_farm"}
+            yield "browser_workers_busy", busy, {}
+
+    def fetch(self, url):
+        future = Future()
+        with self.lock:
+            job_id = self.next_job_id
+            self.next_job_id += 1
+            self.jobs[job_id] = [url, future, 0, None]
+            self.pending.append(job_id)
+            self.dispatch()
+        return future.result()
+
+    def dispatch(self):
+        # Every send, retries included, takes a rate-limit token. The reservation is made once per attempt and the
+        # job waits at the head of the queue until its slot comes up, so the lock is never held across a sleep.
+        now = time.monotonic()
+        for worker in self.pool:
+            if not self.pending:
+                return
+            if worker.job_id is None:
+                job = self.jobs[self.pending[0]]
+                if job[3] is None:
+                    job[3] = now + self.rate_limiter.reserve(job[0])
+                if job[3] > now:
+                    return
+                job_id = self.pending.popleft()
+                job[2] += 1
+                job[3] = None
+                worker.job_id = job_id
+                worker.started = now
+                worker.inbox.put((job_id, job[0]))
+
+    def next_wait(self):
+        if self.pending:
+            ready_at = self.jobs[self.pending[0]][3]
+            if ready_at is not None:
+                return min(POLL_INTERVAL, max(0.0, ready_at - time.monotonic()))
+        return POLL_INTERVAL
+
+    def resolve(self, job_id, payload):
+        job = self.jobs.pop(job_id, None)
+        if job is not None:
+            job[1].set_result(payload)
+
+    def collect(self):
+        while not self.closed.is_set():
+            with self.lock:
+                pool = list(self.pool)
+                timeout = self.next_wait()
+            for results in wait([worker.results for worker in pool], timeout=timeout):
+                worker = next(worker for worker in pool if worker.results is results)
+                try:
+                    job_id, payload = results.recv()
+                except (EOFError, OSError):
+                    # The worker died; check_workers restarts it and requeues its page.
+                    continue
+                with self.lock:
+                    if worker.job_id == job_id:
+                        worker.job_id = None
+                        latency = time.monotonic() - worker.started
+                        self.rate_limiter.record(self.jobs[job_id][0], 200 if payload is not None else None, latency)
+                        get_metrics().observe("page_render_seconds", latency, mode="farm")
+                        self.resolve(job_id, payload)
+            with self.lock:
+                self.check_workers()
+                self.dispatch()
+
+    def check_workers(self):
+        now = time.monotonic()
+        for worker in list(self.pool):
+            hung = worker.job_id is not None and now - worker.started > self.page_timeout
+            if worker.process.is_alive() and not hung:
+                continue
+            if hung:
+                log.warning("Browser worker %s timed out, restarting it.", worker.worker_id)
+                worker.process.kill()
+            else:
+                log.warning("Browser worker %s exited with code %s, restarting it.", worker.worker_id,
+                            worker.process.exitcode)
+            worker.process.join()
+            worker.close()
+            self.restarts += 1
+            get_metrics().inc("browser_worker_restarts")
+            self.pool[worker.worker_id] = BrowserWorker(worker.worker_id, self.context, self.parse)
+            if worker.job_id is not None:
+                self.retry(worker.job_id)
+
+    def retry(self, job_id):
+        url, _, attempts, _ = self.jobs[job_id]
+        if attempts >= self.max_attempts:
+            log.error("Giving up on %s after %s attempts.", url, attempts)
+            self.resolve(job_id, None)
+        else:
+            self.pending.appendleft(job_id)
+
+    def close(self):
+        self.closed.set()
+        if self.collector is not None:
+            self.collector.join()
+        with self.lock:
+            for job_id in list(self.jobs):
+                self.resolve(job_id, None)
+            for worker in self.pool:
+                worker.inbox.put(None)
+        for worker in self.pool:
+            worker.process.join(timeout=10)
+            if worker.process.is_alive():
+                worker.process.kill()
+                worker.process.join()
+            worker.close()
+        if self.restarts:
+            log.info("Browser farm restarted %s crashed or stuck workers.", self.restarts)
@@ -0,0 +1,145 @@
+import datetime
+import hashlib
+import json
+import os
+import threading
+import uuid
+
+CHECKPOINT_DIR = os.path.join("data", "checkpoints")
+
+
+def run_id(keywords):
+    return hashlib.sha1("\n".join(keywords).encode("utf-8")).hexdigest()[:16]
+
+
+class CrawlCheckpoint:
+    def __init__(self, keywords, directory=CHECKPOINT_DIR):
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        self.path = os.path.join(directory, f"{run_id(keywords)}.jsonl")
+        self.lock = threading.Lock()
+        self.timestamp = None
+        self.total_pages = {}
+        self.completed = {}
+        self.session = uuid.uuid4().hex[:12]
+        self.pending = {}
+        self.failed = {}
+        self.resumed = os.path.exists(self.path)
+        if self.resumed:
+            self.load()
+        self.file = open(self.path, "a", encoding="utf-8")
+        if self.resumed and not self.ends_with_newline():
+            self.file.write("\n")
+        if self.timestamp is None:
+            self.timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
+            self.write({"type": "run", "timestamp": self.timestamp, "keywords": keywords}, sync=True)
+
+    def entries(self):
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+    def load(self):
+        for entry in self.entries():
+            if entry["type"] == "run":
+                self.timestamp = entry["timestamp"]
+            elif entry["type"] == "page":
+                self.completed[(entry["keyword"], entry["page"])] = entry["session"]
+                self.total_pages[entry["keyword"]] = entry["total_pages"]
+
+    def ends_with_newline(self):
+        with open(self.path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() == 0:
+                return True
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    def write(self, entry, sync=False):
+        self.file.write(json.dumps(entry) + "\n")
+        self.file.flush()
+        if sync:
+            os.fsync(self.file.fileno())
+
+    def is_done(self, keyword, page):
+        with self.lock:
+            return (keyword, page) in self.completed
+
+    def completed_pages(self):
+        with self.lock:
+            return list(self.completed)
+
+    def page_count(self, keyword):
+        with self.lock:
+            return self.total_pages.get(keyword)
+
+    def completed_entries(self, entry_type):
+        with self.lock:
+            self.file.flush()
+            completed = dict(self.completed)
+        for entry in self.entries():
+            if entry["type"] == entry_type and completed.get((entry["keyword"], entry["page"])) == entry["session"]:
+                yield entry
+
+    def iter_rows(self):
+        for entry in self.completed_entries("row"):
+            yield entry["row"]
+
+    def iter_duplicates(self):
+        for entry in self.completed_entries("duplicates"):
+            for row in entry["rows"]:
+                yield entry["keyword"], row
+
+    def start_page(self, keyword, page, total_pages, row_count, duplicates=()):
+        with self.lock:
+            if duplicates:
+                self.write({"type": "duplicates", "keyword": keyword, "page": page, "session": self.session,
+                            "rows": list(duplicates)})
+            self.total_pages.setdefault(keyword, total_pages)
+            self.pending[(keyword, page)] = row_count
+            if row_count == 0:
+                self.complete_page(keyword, page)
+
+    def row_done(self, keyword, page, row, failed=False):
+        with self.lock:
+            key = (keyword, page)
+            if row is not None:
+                self.write({"type": "row", "keyword": keyword, "page": page, "session": self.session,
+                            "row": dict(row.items())})
+            if failed:
+                self.failed[key] = self.failed.get(key, 0) + 1
+            self.pending[key] -= 1
+            if self.pending[key] == 0:
+                if key in self.failed:
+                    # Leave the page incomplete so a resumed run fetches it again and retries the failed listings.
+                    del self.pending[key]
+                else:
+                    self.complete_page(keyword, page)
+
+    def page_failed(self, keyword, page):
+        with self.lock:
+            key = (keyword, page)
+            self.failed[key] = self.failed.get(key, 0) + 1
+
+    def failed_pages(self):
+        with self.lock:
+            return list(self.failed)
+
+    def complete_page(self, keyword, page):
+        key = (keyword, page)
+        del self.pending[key]
+        self.completed[key] = self.session
+        self.write({"type": "page", "keyword": keyword, "page": page, "session": self.session,
+                    "total_pages": self.total_pages[keyword]}, sync=True)
+
+    def finish(self):
+        with self.lock:
+            self.file.close()
+            os.remove(self.path)
+
+    def close(self):
+        with self.lock:
+            self.file.close()
@@ -0,0 +1,88 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+MAX_IN_FLIGHT = 8
+MAX_PER_HOST = 4
+
+log = logging.getLogger(__name__)
+
+
+class CrawlScheduler:
+    def __init__(self, url_for, fetch, page_count, on_page, max_in_flight=MAX_IN_FLIGHT, max_per_host=MAX_PER_HOST,
+                 is_done=None, known_page_count=None):
+        self.url_for = url_for
+        self.fetch = fetch
+        self.page_count = page_count
+        self.on_page = on_page
+        self.is_done = is_done or (lambda keyword, page: False)
+        self.known_page_count = known_page_count or (lambda keyword: None)
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_per_host = max(1, max_per_host)
+        self.host_limits = {}
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.done = threading.Event()
+        self.executor = None
+
+    def host_limit(self, url):
+        host = urlparse(url).netloc
+        with self.lock:
+            if host not in self.host_limits:
+                self.host_limits[host] = threading.BoundedSemaphore(self.max_per_host)
+            return self.host_limits[host]
+
+    def crawl(self, keywords):
+        if not keywords:
+            return
+        self.done.clear()
+        with ThreadPoolExecutor(max_workers=self.max_in_flight) as executor:
+            self.executor = executor
+            with self.lock:
+                self.pending += 1
+            for keyword in keywords:
+                if not self.is_done(keyword, 1):
+                    self.submit(keyword, 1)
+                elif self.known_page_count(keyword):
+                    self.submit_remaining(keyword, self.known_page_count(keyword))
+            self.job_finished()
+            self.done.wait()
+        self.executor = None
+
+    def submit(self, keyword, page):
+        with self.lock:
+            self.pending += 1
+        self.executor.submit(self.run_job, keyword, page)
+
+    def submit_remaining(self, keyword, total_pages):
+        for next_page in range(2, total_pages + 1):
+            if not self.is_done(keyword, next_page):
+                self.submit(keyword, next_page)
+
+    def job_finished(self):
+        with self.lock:
+            self.pending -= 1
+            if self.pending == 0:
+                self.done.set()
+
+    def run_job(self, keyword, page):
+        try:
+            url = self.url_for(keyword, page)
+            with self.host_limit(url):
+                state = self.fetch(url)
+            if page == 1 and state is not None:
+                self.submit_remaining(keyword, self.page_count(state))
+            self.on_page(keyword, page, state)
+        except Exception as e:
+            log.warning("Page %s of '%s' failed: %s", page, keyword, e)
+            self.report_failure(keyword, page)
+        finally:
+            self.job_finished()
+
+    def report_failure(self, keyword, page):
+        # A page with no state is how on_page learns of a failure, so progress and the checkpoint count it.
+        try:
+            self.on_page(keyword, page, None)
+        except Exception as e:
+            log.warning("Could not report failed page %s of '%s': %s", page, keyword, e)
@@ -0,0 +1,122 @@
+import glob
+import os
+import re
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+DATASET_DIR = os.path.join("data", "dataset")
+BATCH_ROWS = 20000
+ROWS_PER_GROUP = 16384
+
+STRING_FIELDS = ["address", "state", "suburb", "phone", "category", "description", "name", "email", "detailsLink",
+                 "review", "abn"]
+SCHEMA = pa.schema(
+    [("address", pa.string()), ("postCode", pa.int32()), ("state", pa.string()), ("suburb", pa.string()),
+     ("phone", pa.string()), ("category", pa.string()), ("description", pa.string()), ("name", pa.string()),
+     ("email", pa.string()), ("detailsLink", pa.string()), ("review", pa.string()), ("longitude", pa.float64()),
+     ("latitude", pa.float64()), ("abn", pa.string()), ("keyword", pa.string()), ("run_id", pa.string()),
+     ("run_date", pa.string())])
+PARTITIONING = ds.partitioning(pa.schema([("run_date", pa.string()), ("keyword", pa.string())]), flavor="hive")
+PARTITION_FIELDS = ["run_date", "keyword"]
+DATA_FIELDS = [name for name in SCHEMA.names if name not in ("run_id", "run_date")]
+
+_csv_name = re.compile(r"yellowpages_data_(\d{14})\.csv$")
+
+
+def to_int(value):
+    try:
+        return int(str(value).strip())
+    except (TypeError, ValueError):
+        return None
+
+
+def to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def to_str(value):
+    if value is None or (isinstance(value, float) and value != value):
+        return None
+    return str(value)
+
+
+def run_id_from_csv(path):
+    match = _csv_name.search(os.path.basename(path))
+    return match.group(1) if match else None
+
+
+class DatasetWriter:
+    def __init__(self, run_id, directory=DATASET_DIR, batch_rows=BATCH_ROWS):
+        self.run_id = run_id
+        self.run_date = run_id[:8]
+        self.directory = directory
+        self.batch_rows = batch_rows
+        self.columns = {name: [] for name in SCHEMA.names}
+        self.buffered = 0
+        self.batches = 0
+        for path in glob.glob(os.path.join(directory, "*", "*", f"{run_id}-*.parquet")):
+            os.remove(path)
+
+    def write(self, row):
+        columns = self.columns
+        for name in STRING_FIELDS:
+            columns[name].append(to_str(row.get(name)))
+        columns["postCode"].append(to_int(row.get("postCode")))
+        columns["longitude"].append(to_float(row.get("longitude")))
+        columns["latitude"].append(to_float(row.get("latitude")))
+        columns["keyword"].append(to_str(row.get("keyword")) or "")
+        columns["run_id"].append(self.run_id)
+        columns["run_date"].append(self.run_date)
+        self.buffered += 1
+        if self.buffered >= self.batch_rows:
+            self.flush()
+
+    def flush(self):
+        if not self.buffered:
+            return
+        table = pa.table(self.columns, schema=SCHEMA).sort_by([("keyword", "ascending"), ("postCode", "ascending")])
+        ds.write_dataset(table, self.directory, format="parquet", partitioning=PARTITIONING,
+                         basename_template=f"{self.run_id}-{self.batches}-{{i}}.parquet",
+                         existing_data_behavior="overwrite_or_ignore", max_rows_per_group=ROWS_PER_GROUP)
+        self.batches += 1
+        self.columns = {name: [] for name in SCHEMA.names}
+        self.buffered = 0
+
+    def close(self):
+        self.flush()
+
+
+def has_run(run_id, directory=DATASET_DIR):
+    return bool(glob.glob(os.path.join(directory, f"run_date={run_id[:8]}", "*", f"{run_id}-*.parquet")))
+
+
+def load_run(run_id, columns=None, postcode=None, keyword=None, limit=None, directory=DATASET_DIR):
+    dataset = ds.dataset(directory, format="parquet", partitioning=PARTITIONING, schema=SCHEMA)
+    expression = (ds.field("run_date") == run_id[:8]) & (ds.field("run_id") == run_id)
+    if postcode is not None:
+        expression &= ds.field("postCode") == int(postcode)
+    if keyword is not None:
+        expression &= ds.field("keyword") == keyword
+    columns = list(columns) if columns else DATA_FIELDS
+    if limit:
+        table = dataset.head(int(limit), columns=columns, filter=expression)
+    else:
+        table = dataset.to_table(columns=columns, filter=expression)
+    return table.to_pandas()
+
+
+def load_results(csv_path, postcode=None, limit=None, columns=None):
+    run_id = run_id_from_csv(csv_path)
+    if run_id and has_run(run_id):
+        return load_run(run_id, columns=columns, postcode=postcode, limit=limit)
+    df = pd.read_csv(csv_path, usecols=columns)
+    if postcode is not None:
+        df = df[df['postCode'] == int(postcode)]
+    if limit:
+        df = df.head(int(limit))
+    return df
@@ -0,0 +1,151 @@
+import collections
+import logging
+import queue
+import threading
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+ENRICHMENT_WORKERS = 8
+MAX_QUEUED_PER_WORKER = 50
+
+_STOP = object()
+
+log = logging.getLogger(__name__)
+
+
+class SessionPool:
+    def __init__(self, pool_size=ENRICHMENT_WORKERS):
+        self.pool_size = pool_size
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.sessions = []
+
+    def get(self, url):
+        host = urlparse(url).netloc
+        sessions = getattr(self.local, "sessions", None)
+        if sessions is None:
+            sessions = self.local.sessions = {}
+        if host not in sessions:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            sessions[host] = session
+            with self.lock:
+                self.sessions.append(session)
+        return sessions[host]
+
+    def for_host(self, url):
+        return HostSession(self, url)
+
+    def close(self):
+        with self.lock:
+            sessions, self.sessions = self.sessions, []
+        for session in sessions:
+            session.close()
+
+
+class HostSession:
+    def __init__(self, pool, url):
+        self.pool = pool
+        self.url = url
+
+    def get(self, url, **kwargs):
+        return self.pool.get(self.url).get(url, **kwargs)
+
+
+class ResultSink:
+    def __init__(self, writers=(), keep_rows=True):
+        self.rows = []
+        self.writers = list(writers)
+        self.keep_rows = keep_rows
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def add(self, row):
+        with self.lock:
+            self.count += 1
+            if self.keep_rows:
+                self.rows.append(row)
+            for writer in self.writers:
+                writer.write(row)
+
+    def close(self):
+        with self.lock:
+            for writer in self.writers:
+                writer.close()
+
+    def __len__(self):
+        with self.lock:
+            return self.count
+
+
+class EnrichmentPipeline:
+    def __init__(self, enrich, sink, workers=ENRICHMENT_WORKERS, max_queued=None, on_done=None):
+        self.enrich = enrich
+        self.sink = sink
+        self.on_done = on_done
+        if max_queued is None:
+            max_queued = workers * MAX_QUEUED_PER_WORKER
+        self.queue = queue.Queue(maxsize=max_queued)
+        self.overflow = collections.deque()
+        self.overflow_lock = threading.Lock()
+        self.workers = []
+        for _ in range(workers):
+            t = threading.Thread(target=self.work, daemon=True)
+            t.start()
+            self.workers.append(t)
+
+    def submit(self, rows, tag=None):
+        # Called from the Qt thread, so never block on a full queue; workers drain the overflow as they free up.
+        with self.overflow_lock:
+            self.overflow.extend((tag, row) for row in rows)
+        self.refill()
+
+    def refill(self):
+        with self.overflow_lock:
+            while self.overflow:
+                try:
+                    self.queue.put_nowait(self.overflow[0])
+                except queue.Full:
+                    return
+                self.overflow.popleft()
+
+    def pending(self):
+        with self.overflow_lock:
+            return self.queue.qsize() + len(self.overflow)
+
+    def work(self):
+        while True:
+            item = self.queue.get()
+            try:
+                if item is _STOP:
+                    return
+                tag, row = item
+                result = None
+                failed = False
+                try:
+                    result = self.enrich(row)
+                    if result is not None:
+                        self.sink.add(result)
+                except Exception as e:
+                    failed = True
+                    log.warning("Enrichment failed for '%s': %s", row.get('name'), e)
+                if self.on_done is not None:
+                    self.on_done(tag, row, result, failed)
+            except Exception as e:
+                log.warning("Enrichment callback failed: %s", e)
+            finally:
+                if item is not _STOP:
+                    self.refill()
+                self.queue.task_done()
+
+    def close(self):
+        self.queue.join()
+        for _ in self.workers:
+            self.queue.put(_STOP)
+        for t in self.workers:
+            t.join()
+        self.workers = []
@@ -0,0 +1,39 @@
+import json
+import logging
+
+STATE_MARKER = "window.__INITIAL_STATE__"
+
+_decoder = json.JSONDecoder()
+
+log = logging.getLogger(__name__)
+
+
+def find_state_offset(html_content, start=0):
+    marker = html_content.find(STATE_MARKER, start)
+    while marker != -1:
+        offset = marker + len(STATE_MARKER)
+        while offset < len(html_content) and html_content[offset].isspace():
+            offset += 1
+        if html_content.startswith("=", offset):
+            offset += 1
+            while offset < len(html_content) and html_content[offset].isspace():
+                offset += 1
+            return offset
+        marker = html_content.find(STATE_MARKER, offset)
+    return -1
+
+
+def extract_initial_state(html_content):
+    if not html_content:
+        return None
+    offset = find_state_offset(html_content)
+    if offset == -1:
+        return None
+    try:
+        state, _ = _decoder.raw_decode(html_content, offset)
+    except ValueError as e:
+        log.warning("Could not decode page state: %s", e)
+        return None
+    if not isinstance(state, dict):
+        return None
+    return state
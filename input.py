@@ -1,84 +1,82 @@
-import json
-import re
+import logging
 import sys
-from PyQt5.QtCore import QCoreApplication, Qt
+import threading
+from PyQt5.QtCore import QCoreApplication, Qt, pyqtSignal
 from PyQt5.QtWidgets import QApplication, QMainWindow
 from PyQt5.QtWebEngineWidgets import QWebEngineView
-from PyQt5.QtCore import QUrl
-from bs4 import BeautifulSoup
-from colorama import Fore, Style
+from page_loader import PageStateLoader
+from rate_limiter import get_rate_limiter
+from listing_parser import log_listing, parse_listings
+from metrics import configure_logging
+from page_fetcher import FETCH_MODE_BROWSER, FETCH_MODE_HTTP, SEARCH_URL, check_fetch_mode, fetch_initial_state
+
+log = logging.getLogger(__name__)
 
 
 class HeadlessWebScraper(QMainWindow):
-    def __init__(self, url):
+    page_fetched = pyqtSignal(str, object)
+
+    def __init__(self, url, fetch_mode=FETCH_MODE_BROWSER):
         super().__init__()
         self.url = url
         self.app = QApplication(sys.argv)
-        self.browser = QWebEngineView()
-        self.browser.setPage(self.browser.page())
-        self.browser.loadFinished.connect(self.on_load_finished)
-        self.browser.load(QUrl(self.url))
+        self.fetch_mode = check_fetch_mode(fetch_mode)
+        self.browser = None
+        self.page_fetched.connect(self.on_fetched)
+        if self.fetch_mode == FETCH_MODE_HTTP:
+            threading.Thread(target=self.fetch_url, args=(self.url,), daemon=True).start()
+        else:
+            self.load_in_browser(self.url)
+
+    def get_browser(self):
+        if self.browser is None:
+            self.browser = QWebEngineView()
+            self.browser.setPage(self.browser.page())
+            self.page_loader = PageStateLoader(self.browser, self.on_browser_state, rate_limiter=get_rate_limiter())
+        return self.browser
+
+    def load_in_browser(self, url):
+        self.get_browser()
+        self.page_loader.load(url)
 
     def run(self):
         self.app.exec_()
 
-    def on_load_finished(self):
-        self.browser.page().toHtml(self.save_html)
+    def fetch_url(self, url):
+        self.page_fetched.emit(url, fetch_initial_state(url))
+
+    def on_fetched(self, url, json_data):
+        if json_data is None:
+            log.info("No page state in HTTP response for %s, falling back to browser.", url)
+            self.load_in_browser(url)
+            return
+        self.save_state(json_data)
+
+    def on_browser_state(self, json_data):
+        self.save_state(json_data)
 
-    def save_html(self, html_content):
-        soup = BeautifulSoup(html_content, 'html.parser')
-        pattern = re.compile(r"window\.__INITIAL_STATE__ = ({.*?});", re.MULTILINE | re.DOTALL)
-        script_tag = soup.find("script", text=pattern)
-        if not script_tag:
-            print("Something went wrong not able to see the data")
-        match = pattern.search(script_tag.string)
-        initial_state_data = match.group(1)
-        json_data = json.loads(initial_state_data)
-        inAreaResultViews = json_data["model"]["inAreaResultViews"]
-        for bus in inAreaResultViews:
-            try:
-                addressView = bus.get("addressView", {})
-                company_info = {
-                    "address": addressView.get("asContactCardFormat", ""),
-                    "postCode": addressView.get("postCode", ""),
-                    "state": addressView.get("state", ""),
-                    "suburb": addressView.get("suburb", ""),
-                    "phone": bus.get("callContactNumber", {}).get("displayValue", ""),
-                    "category": bus.get("category").get("name"),
-                    "detailsLink": bus.get("detailsLink", ""),
-                    "description": bus.get("longDescriptor", ""),
-                    "name": bus.get("name", ""),
-                    "email": bus.get("primaryEmail", "")
-                }
-                print(Fore.BLUE + "Company Information:")
-                print(Fore.CYAN + f"Address: {company_info['address']}")
-                print(Fore.CYAN + f"PostCode: {company_info['postCode']}")
-                print(Fore.CYAN + f"State: {company_info['state']}")
-                print(Fore.CYAN + f"Suburb: {company_info['suburb']}")
-                print(Fore.CYAN + f"Phone: {company_info['phone']}")
-                print(Fore.CYAN + f"Category: {company_info['category']}")
-                print(Fore.CYAN + f"Details Link: {company_info['detailsLink']}")
-                print(Fore.CYAN + f"Description: {company_info['description']}")
-                print(Fore.CYAN + f"Name: {company_info['name']}")
-                print(Fore.CYAN + f"Email: {company_info['email']}")
-                print(Fore.RESET)
-                print("-" * 30)
-            except:
-                continue
+    def save_state(self, json_data):
+        if json_data is None:
+            log.warning("No page state, skipping this page.")
+            return
+        for company_info in parse_listings(json_data):
+            log_listing(company_info)
 
 
-def get_html_fromyellow():
+def get_html_fromyellow(fetch_mode=FETCH_MODE_BROWSER):
     app = QApplication(sys.argv)
     query = input("Please enter keyword or name: ")
     if not query:
         print("Program closed")
         return
-    url = f"https://www.yellowpages.com.au/search/listings?clue={query}&locationClue=&lat=&lon="
-    scraper = HeadlessWebScraper(url)
+    url = SEARCH_URL.format(keyword=query, location="", page=1)
+    scraper = HeadlessWebScraper(url, fetch_mode=fetch_mode)
     scraper.run()
     scraper.hide()
     sys.exit(app.exec_())
 
 
 if __name__ == '__main__':
-    get_html_fromyellow()
+    # Showing the matching listings is the point of this lookup tool, so log them by default.
+    configure_logging("DEBUG")
+    get_html_fromyellow(sys.argv[1] if len(sys.argv) > 1 else FETCH_MODE_BROWSER)
@@ -0,0 +1,112 @@
+import gzip
+import json
+import logging
+import os
+import sys
+import threading
+from collections import defaultdict
+
+SYNONYM_INDEX_PATH = os.path.join("data", "synonym_index.json.gz")
+MAX_SYNONYMS = 20
+DEFAULT_FAN_OUT = 5
+# WordNet's morphy detachment rules (noun, then verb, then adjective), so inflected keywords reach the same base form
+# wordnet.synsets used to find.
+DETACHMENT_RULES = (("s", ""), ("ses", "s"), ("ves", "f"), ("xes", "x"), ("zes", "z"), ("ches", "ch"), ("shes", "sh"),
+                    ("men", "man"), ("ies", "y"), ("es", "e"), ("es", ""), ("ed", "e"), ("ed", ""), ("ing", "e"),
+                    ("ing", ""), ("er", ""), ("est", ""), ("er", "e"), ("est", "e"))
+
+log = logging.getLogger(__name__)
+
+
+def lemma_key(word):
+    return word.strip().lower().replace(" ", "_")
+
+
+def build_synonym_index(path=SYNONYM_INDEX_PATH, max_synonyms=MAX_SYNONYMS):
+    # Only the offline build touches WordNet; the app reads the file this writes.
+    from nltk.corpus import wordnet
+
+    index = {}
+    for name in wordnet.all_lemma_names():
+        scores = defaultdict(int)
+        for syn in wordnet.synsets(name):
+            for lemma in syn.lemmas():
+                synonym = lemma.name()
+                if synonym.lower() != name:
+                    scores[synonym] += lemma.count() + 1
+        if scores:
+            ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+            index[name] = [synonym for synonym, _ in ranked[:max_synonyms]]
+    directory = os.path.dirname(path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+    partial_path = path + ".partial"
+    with gzip.open(partial_path, "wt", encoding="utf-8") as f:
+        json.dump(index, f, separators=(",", ":"))
+    os.replace(partial_path, path)
+    print(f"Wrote {len(index)} synonym entries to {path}")
+    return len(index)
+
+
+class KeywordExpander:
+    def __init__(self, path=SYNONYM_INDEX_PATH):
+        self.path = path
+        self.index = None
+        self.missing = False
+        self.expansions = {}
+        self.lock = threading.Lock()
+
+    def load(self):
+        with self.lock:
+            if self.index is None:
+                if os.path.exists(self.path):
+                    with gzip.open(self.path, "rt", encoding="utf-8") as f:
+                        self.index = json.load(f)
+                else:
+                    log.warning("Synonym index %s not found, keywords will not be expanded. "
+                                "Build it with: python keyword_expansion.py", self.path)
+                    self.missing = True
+                    self.index = {}
+        return self.index
+
+    def synonyms(self, keyword):
+        key = lemma_key(keyword)
+        if key not in self.expansions:
+            index = self.load()
+            synonyms = index.get(key)
+            for suffix, ending in DETACHMENT_RULES:
+                if synonyms is not None:
+                    break
+                if key.endswith(suffix) and len(key) > len(suffix):
+                    synonyms = index.get(key[:-len(suffix)] + ending)
+            self.expansions[key] = synonyms or []
+        return self.expansions[key]
+
+    def related_keywords(self, keywords, top_n=DEFAULT_FAN_OUT):
+        related_keywords_dict = {}
+        list_of_keywords = set()
+        for keyword in keywords:
+            list_of_keywords.add(keyword)
+            related = [keyword]
+            for synonym in self.synonyms(keyword):
+                if len(related) >= top_n:
+                    break
+                if synonym.lower() not in list_of_keywords and synonym not in related:
+                    related.append(synonym)
+            related_keywords_dict[keyword] = related
+            list_of_keywords.update(related)
+        return related_keywords_dict, list(list_of_keywords)
+
+
+_expander = None
+
+
+def get_expander():
+    global _expander
+    if _expander is None:
+        _expander = KeywordExpander()
+    return _expander
+
+
+if __name__ == '__main__':
+    build_synonym_index(sys.argv[1] if len(sys.argv) > 1 else SYNONYM_INDEX_PATH)
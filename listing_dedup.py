@@ -0,0 +1,90 @@
+import os
+import re
+import threading
+from urllib.parse import urlsplit
+
+from abn_cache import normalize_name
+from output_writer import StreamingCSVWriter
+
+MATCHES_DIR = os.path.join("data", "matches")
+MATCH_FIELDS = ["detailsLink", "name", "keyword"]
+KEY_FIELDS = ("detailsLink", "name", "phone", "address")
+
+_non_digit = re.compile(r"\D+")
+
+
+def listing_keys(row):
+    keys = []
+    link = row.get("detailsLink")
+    if link:
+        parts = urlsplit(str(link).strip())
+        keys.append(f"link:{parts.netloc.lower()}{parts.path.rstrip('/').lower()}")
+    name = normalize_name(row.get("name"))
+    if name:
+        phone = _non_digit.sub("", str(row.get("phone") or ""))
+        if len(phone) >= 8:
+            keys.append(f"phone:{phone}|{name}")
+        address = normalize_name(row.get("address"))
+        if address:
+            keys.append(f"address:{address}|{name}")
+    return keys
+
+
+def key_fields(row):
+    return {field: row.get(field) for field in KEY_FIELDS}
+
+
+class ListingDeduplicator:
+    def __init__(self, matches_path=None):
+        self.lock = threading.Lock()
+        self.seen = {}
+        self.pending = {}
+        self.unique = 0
+        self.duplicates = 0
+        self.matches = StreamingCSVWriter(matches_path, MATCH_FIELDS) if matches_path else None
+
+    def add(self, row, keyword):
+        keys = listing_keys(row)
+        with self.lock:
+            canonical = None
+            for key in keys:
+                if key in self.seen:
+                    canonical = self.seen[key]
+                    break
+            is_new = canonical is None
+            if is_new:
+                canonical = (row.get("detailsLink", ""), row.get("name", ""), set())
+                self.unique += 1
+            else:
+                self.duplicates += 1
+            for key in keys:
+                self.seen.setdefault(key, canonical)
+                for pending_keyword in self.pending.pop(key, ()):
+                    self.record(canonical, pending_keyword)
+            self.record(canonical, keyword)
+            return is_new
+
+    def add_match(self, row, keyword):
+        # Replays a duplicate from a resumed run. Its first sighting may be on a page that is fetched again, so an
+        # unknown listing is held until that page turns it up instead of being taken as new and skipping it there.
+        keys = listing_keys(row)
+        with self.lock:
+            self.duplicates += 1
+            for key in keys:
+                if key in self.seen:
+                    self.record(self.seen[key], keyword)
+                    return
+            for key in keys:
+                self.pending.setdefault(key, []).append(keyword)
+
+    def record(self, canonical, keyword):
+        keywords = canonical[2]
+        if keyword not in keywords:
+            keywords.add(keyword)
+            if self.matches is not None:
+                self.matches.write({"detailsLink": canonical[0], "name": canonical[1], "keyword": keyword})
+
+    def close(self):
+        with self.lock:
+            if self.matches is not None:
+                self.matches.close()
@@ -0,0 +1,107 @@
+import logging
+
+from page_fetcher import count_pages
+
+LISTING_FIELDS = ("address", "postCode", "state", "suburb", "phone", "category", "description", "name", "email",
+                  "detailsLink", "review", "longitude", "latitude", "abn", "keyword")
+_field_set = frozenset(LISTING_FIELDS)
+
+log = logging.getLogger(__name__)
+
+
+class Listing:
+    # Slots instead of a per-row dict; the mapping methods keep it usable wherever a row dict was.
+    __slots__ = LISTING_FIELDS
+
+    def __init__(self, **fields):
+        for name in LISTING_FIELDS:
+            setattr(self, name, fields.get(name))
+
+    @classmethod
+    def from_dict(cls, row):
+        return cls(**{name: row.get(name) for name in LISTING_FIELDS})
+
+    def get(self, name, default=None):
+        value = getattr(self, name, None) if name in _field_set else None
+        return default if value is None else value
+
+    def __getitem__(self, name):
+        if name not in _field_set:
+            raise KeyError(name)
+        return getattr(self, name)
+
+    def __setitem__(self, name, value):
+        if name not in _field_set:
+            raise KeyError(name)
+        setattr(self, name, value)
+
+    def __contains__(self, name):
+        return name in _field_set
+
+    def keys(self):
+        return LISTING_FIELDS
+
+    def items(self):
+        return [(name, getattr(self, name)) for name in LISTING_FIELDS]
+
+    def to_dict(self):
+        return dict(self.items())
+
+    def to_row(self):
+        return tuple(getattr(self, name) for name in LISTING_FIELDS)
+
+    def __eq__(self, other):
+        return isinstance(other, Listing) and self.to_row() == other.to_row()
+
+    def __repr__(self):
+        return f"Listing({self.name!r}, {self.postCode!r})"
+
+
+def listing_columns(listings):
+    rows = [listing.to_row() for listing in listings]
+    if not rows:
+        return {name: [] for name in LISTING_FIELDS}
+    return dict(zip(LISTING_FIELDS, map(list, zip(*rows))))
+
+
+def parse_listings(json_data):
+    _scraped_data = []
+    inAreaResultViews = json_data["model"]["inAreaResultViews"]
+    for bus in inAreaResultViews:
+        try:
+            featuredReview = ""
+            avg_review = bus.get("averageRatings", {})
+            yellow_summery = avg_review.get("yellowReviewSummary", {})
+            searchableAddress = bus.get('searchableAddress', {})
+            if yellow_summery is not None:
+                featuredReview = yellow_summery.get('featuredReview', {}).get("reviewText")
+            addressView = bus.get("addressView", {})
+            company_info = Listing(
+                address=addressView.get("asContactCardFormat", ""),
+                postCode=addressView.get("postCode", ""),
+                state=addressView.get("state", ""),
+                suburb=addressView.get("suburb", ""),
+                phone=bus.get("callContactNumber", {}).get("displayValue", ""),
+                category=bus.get("category").get("name"),
+                description=bus.get("longDescriptor", ""),
+                name=bus.get("name", ""),
+                email=bus.get("primaryEmail", ""),
+                detailsLink=bus.get("detailsLink", ""),
+                review=featuredReview,
+                longitude=searchableAddress.get('longitude', ""),
+                latitude=searchableAddress.get("latitude", ""))
+            _scraped_data.append(company_info)
+        except:
+            continue
+    return _scraped_data
+
+
+def parse_page(json_data, max_records):
+    return parse_listings(json_data), count_pages(json_data["model"]["pagination"], max_records)
+
+
+def log_listing(company_info):
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug("Listing %s | %s %s %s %s | phone %s | category %s | email %s | %s", company_info['name'],
+                  company_info['address'], company_info['suburb'], company_info['state'], company_info['postCode'],
+                  company_info['phone'], company_info['category'], company_info['email'], company_info['detailsLink'])
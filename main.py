@@ -1,19 +1,24 @@
-import json
-import re
+import logging
 import sys
-import time
+import threading
 
-from PyQt5.QtCore import QCoreApplication, Qt
+from PyQt5.QtCore import QCoreApplication, Qt, pyqtSignal
 from PyQt5.QtWidgets import QApplication, QMainWindow
 from PyQt5.QtWebEngineWidgets import QWebEngineView
-from PyQt5.QtCore import QUrl
-from bs4 import BeautifulSoup
-from colorama import Fore, Style
 import warnings
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from page_loader import PageStateLoader
+from rate_limiter import get_rate_limiter
+from page_fetcher import FETCH_MODE_BROWSER, FETCH_MODE_FARM, FETCH_MODE_HTTP, SEARCH_URL, check_fetch_mode, \
+    fetch_initial_state
+from browser_farm import FARM_WORKERS, BrowserFarm
+from listing_parser import listing_columns, log_listing, parse_listings
+from metrics import configure_logging
 
 
 warnings.filterwarnings("ignore", category=DeprecationWarning)
+log = logging.getLogger(__name__)
 total_record_counter = 0
 scraped_data = []
 default_keywords = [
@@ -46,93 +51,100 @@ default_keywords = [
 
 
 class HeadlessWebScraper(QMainWindow):
-    def __init__(self, urls):
+    page_fetched = pyqtSignal(str, object)
+
+    def __init__(self, urls, fetch_mode=FETCH_MODE_BROWSER, farm_workers=FARM_WORKERS):
         super().__init__()
         self.urls = urls
         self.app = QApplication(sys.argv)
-        self.browser = QWebEngineView()
-        self.browser.setPage(self.browser.page())
-        self.browser.loadFinished.connect(self.on_load_finished)
+        self.fetch_mode = check_fetch_mode(fetch_mode)
+        self.farm_workers = farm_workers
+        self.browser = None
+        if self.fetch_mode == FETCH_MODE_BROWSER:
+            self.get_browser()
         self.current_url_index = 0
+        self.page_fetched.connect(self.on_fetched)
+
+    def get_browser(self):
+        if self.browser is None:
+            self.browser = QWebEngineView()
+            self.browser.setPage(self.browser.page())
+            self.page_loader = PageStateLoader(self.browser, self.on_browser_state, rate_limiter=get_rate_limiter())
+        return self.browser
+
+    def load_in_browser(self, url):
+        self.get_browser()
+        self.page_loader.load(url)
 
     def load_next_url(self):
         if self.current_url_index < len(self.urls):
-            url = QUrl(self.urls[self.current_url_index])
-            self.browser.load(url)
+            url = self.urls[self.current_url_index]
+            if self.fetch_mode == FETCH_MODE_HTTP:
+                threading.Thread(target=self.fetch_url, args=(url,), daemon=True).start()
+            else:
+                self.load_in_browser(url)
             self.current_url_index += 1
         else:
             self.app.quit()
 
     def run(self):
+        if self.fetch_mode == FETCH_MODE_FARM:
+            self.run_farm()
+            return
         self.load_next_url()
         self.app.exec_()
 
-    def on_load_finished(self):
-        self.browser.page().toHtml(self.save_html)
+    def run_farm(self):
+        farm = BrowserFarm(self.farm_workers).start()
+        try:
+            with ThreadPoolExecutor(max_workers=farm.workers) as executor:
+                for json_data in executor.map(farm.fetch, self.urls):
+                    self.parse_state(json_data)
+        finally:
+            farm.close()
+
+    def fetch_url(self, url):
+        self.page_fetched.emit(url, fetch_initial_state(url))
+
+    def on_fetched(self, url, json_data):
+        if json_data is None:
+            log.info("No page state in HTTP response for %s, falling back to browser.", url)
+            self.load_in_browser(url)
+            return
+        self.save_state(json_data)
 
-    def save_html(self, html_content):
-        soup = BeautifulSoup(html_content, 'html.parser')
-        pattern = re.compile(r"window\.__INITIAL_STATE__ = ({.*?});", re.MULTILINE | re.DOTALL)
-        script_tag = soup.find("script", text=pattern)
-        if not script_tag:
-            print("Something went wrong not able to see the data")
+    def on_browser_state(self, json_data):
+        self.save_state(json_data)
+
+    def save_state(self, json_data):
+        self.parse_state(json_data)
+        self.load_next_url()
+
+    def parse_state(self, json_data):
+        if json_data is None:
+            log.warning("No page state, skipping this page.")
         else:
-            match = pattern.search(script_tag.string)
-            initial_state_data = match.group(1)
-            json_data = json.loads(initial_state_data)
-            inAreaResultViews = json_data["model"]["inAreaResultViews"]
             pagination = json_data["model"]["pagination"]
             global total_record_counter
             total_record_counter += pagination['totalResults']
-            for bus in inAreaResultViews:
-                try:
-                    addressView = bus.get("addressView", {})
-                    company_info = {
-                        "address": addressView.get("asContactCardFormat", ""),
-                        "postCode": addressView.get("postCode", ""),
-                        "state": addressView.get("state", ""),
-                        "suburb": addressView.get("suburb", ""),
-                        "phone": bus.get("callContactNumber", {}).get("displayValue", ""),
-                        "category": bus.get("category").get("name"),
-                        "detailsLink": bus.get("detailsLink", ""),
-                        "description": bus.get("longDescriptor", ""),
-                        "name": bus.get("name", ""),
-                        "email": bus.get("primaryEmail", "")
-                    }
-                    scraped_data.append(company_info)
-                    print(Fore.BLUE + "Company Information:")
-                    print(Fore.CYAN + f"Address: {company_info['address']}")
-                    print(Fore.CYAN + f"PostCode: {company_info['postCode']}")
-                    print(Fore.CYAN + f"State: {company_info['state']}")
-                    print(Fore.CYAN + f"Suburb: {company_info['suburb']}")
-                    print(Fore.CYAN + f"Phone: {company_info['phone']}")
-                    print(Fore.CYAN + f"Category: {company_info['category']}")
-                    print(Fore.CYAN + f"Details Link: {company_info['detailsLink']}")
-                    print(Fore.CYAN + f"Description: {company_info['description']}")
-                    print(Fore.CYAN + f"Name: {company_info['name']}")
-                    print(Fore.CYAN + f"Email: {company_info['email']}")
-                    print(Fore.RESET)
-                    print("-" * 30)
-                except:
-                    continue
-        time.sleep(1)
-        self.load_next_url()
+            for company_info in parse_listings(json_data):
+                scraped_data.append(company_info)
+                log_listing(company_info)
 
 
-def get_html_fromyellow():
-    search_urls = [
-        f"https://www.yellowpages.com.au/search/listings?clue={keyword}&locationClue=New+South+Wales&lat=&lon=" for
-        keyword in default_keywords]
-    scraper = HeadlessWebScraper(search_urls)
+def get_html_fromyellow(fetch_mode=FETCH_MODE_BROWSER):
+    search_urls = [SEARCH_URL.format(keyword=keyword, location="New+South+Wales", page=1) for keyword in default_keywords]
+    scraper = HeadlessWebScraper(search_urls, fetch_mode=fetch_mode)
     scraper.run()
     scraper.hide()
-    df = pd.DataFrame(scraped_data)
+    df = pd.DataFrame(listing_columns(scraped_data))
     df.to_csv('yellowpages_data.csv', index=False)
     print("Total Records found:", total_record_counter)
 
 
 if __name__ == '__main__':
+    configure_logging()
     app = QApplication(sys.argv)
-    get_html_fromyellow()
+    get_html_fromyellow(sys.argv[1] if len(sys.argv) > 1 else FETCH_MODE_BROWSER)
 
     sys.exit(app.exec_())
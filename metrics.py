@@ -0,0 +1,272 @@
+import contextlib
+import cProfile
+import json
+import logging
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+
+METRICS_DIR = os.path.join("data", "metrics")
+EXPORT_INTERVAL = 10
+LOG_LEVEL = os.environ.get("WHS_LOG_LEVEL", "INFO")
+PROFILE = os.environ.get("WHS_PROFILE", "") not in ("", "0")
+LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+log = logging.getLogger(__name__)
+
+
+def configure_logging(level=LOG_LEVEL):
+    if not logging.getLogger().handlers:
+        logging.basicConfig(level=level, format=LOG_FORMAT)
+
+
+def metric_key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+class Timer:
+    __slots__ = ("count", "total", "min", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, value):
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def as_dict(self):
+        return {"count": self.count, "sum": self.total, "min": self.min, "max": self.max,
+                "mean": self.total / self.count if self.count else None}
+
+
+class Metrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.gauges = {}
+        self.timers = {}
+        self.collectors = []
+        self.started = time.time()
+        self.last_snapshot = None
+        self.profiling = False
+        self.profiles = {}
+        self.local = threading.local()
+
+    def reset(self):
+        with self.lock:
+            self.counters = {}
+            self.gauges = {}
+            self.timers = {}
+            self.collectors = []
+            self.started = time.time()
+            self.last_snapshot = None
+
+    def inc(self, name, value=1, **labels):
+        key = metric_key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        with self.lock:
+            self.gauges[metric_key(name, labels)] = value
+
+    def observe(self, name, value, **labels):
+        key = metric_key(name, labels)
+        with self.lock:
+            timer = self.timers.get(key)
+            if timer is None:
+                timer = self.timers[key] = Timer()
+            timer.observe(value)
+
+    @contextlib.contextmanager
+    def timer(self, name, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        # cProfile hooks do not nest, so only the outermost stage on a thread is profiled.
+        profile = None
+        if self.profiling and not getattr(self.local, "profiling", False):
+            profile = self.start_profile(name)
+        if profile is not None:
+            allocated = tracemalloc.get_traced_memory()[0]
+        try:
+            with self.timer("stage_seconds", stage=name):
+                yield
+        finally:
+            if profile is not None:
+                profile.disable()
+                self.local.profiling = False
+                # tracemalloc only keeps a process-wide total, so this includes whatever other threads allocated
+                # while the stage ran.
+                self.inc("process_allocated_bytes", tracemalloc.get_traced_memory()[0] - allocated, stage=name)
+
+    def start_profile(self, name):
+        # One profiler per thread and stage, reused across calls, so profiling a long run stays bounded.
+        profilers = getattr(self.local, "profilers", None)
+        if profilers is None:
+            profilers = self.local.profilers = {}
+        profile = profilers.get(name)
+        if profile is None:
+            profile = profilers[name] = cProfile.Profile()
+            with self.lock:
+                self.profiles.setdefault(name, []).append(profile)
+        try:
+            profile.enable()
+        except ValueError:
+            # From Python 3.12 only one profiler can be active per process, so stages that overlap another
+            # thread's profiled stage are left out of the sample rather than failed.
+            return None
+        self.local.profiling = True
+        return profile
+
+    def enable_profiling(self):
+        self.profiling = True
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def add_collector(self, collect):
+        with self.lock:
+            self.collectors.append(collect)
+
+    def collect(self):
+        with self.lock:
+            collectors = list(self.collectors)
+        for collect in collectors:
+            try:
+                for name, value, labels in collect():
+                    self.set(name, value, **labels)
+            except Exception as e:
+                log.warning("Metrics collector failed: %s", e)
+
+    def snapshot(self):
+        self.collect()
+        now = time.time()
+        with self.lock:
+            counters = {key: value for key, value in self.counters.items()}
+            gauges = dict(self.gauges)
+            timers = {key: timer.as_dict() for key, timer in self.timers.items()}
+        rows = sum(value for (name, _), value in counters.items() if name == "rows_written")
+        rate = {"uptime_seconds": now - self.started, "rows_per_second": rows / max(now - self.started, 1e-9)}
+        if self.last_snapshot is not None:
+            last_time, last_rows = self.last_snapshot
+            rate["interval_rows_per_second"] = (rows - last_rows) / max(now - last_time, 1e-9)
+        self.last_snapshot = (now, rows)
+        return {"time": now, "rates": rate,
+                "counters": [{"name": name, "labels": dict(labels), "value": value}
+                             for (name, labels), value in sorted(counters.items())],
+                "gauges": [{"name": name, "labels": dict(labels), "value": value}
+                           for (name, labels), value in sorted(gauges.items())],
+                "timers": [dict(timer, name=name, labels=dict(labels)) for (name, labels), timer in sorted(timers.items())]}
+
+    def prometheus(self, snapshot):
+        lines = []
+        for kind, entries in (("counter", snapshot["counters"]), ("gauge", snapshot["gauges"])):
+            typed = set()
+            for entry in entries:
+                if entry["name"] not in typed:
+                    typed.add(entry["name"])
+                    lines.append(f"# TYPE whs_{entry['name']} {kind}")
+                lines.append(f"whs_{entry['name']}{format_labels(sorted(entry['labels'].items()))} {entry['value']}")
+        typed = set()
+        for timer in snapshot["timers"]:
+            labels = format_labels(sorted(timer["labels"].items()))
+            if timer["name"] not in typed:
+                typed.add(timer["name"])
+                lines.append(f"# TYPE whs_{timer['name']} summary")
+            lines.append(f"whs_{timer['name']}_count{labels} {timer['count']}")
+            lines.append(f"whs_{timer['name']}_sum{labels} {timer['sum']}")
+        for name, value in snapshot["rates"].items():
+            lines.append(f"# TYPE whs_{name} gauge")
+            lines.append(f"whs_{name} {value}")
+        return "\n".join(lines) + "\n"
+
+    def dump_profiles(self, directory):
+        with self.lock:
+            profiles = {name: list(stage_profiles) for name, stage_profiles in self.profiles.items()}
+        for name, stage_profiles in profiles.items():
+            stats = None
+            for profile in stage_profiles:
+                profile.create_stats()
+                if profile.stats:
+                    stats = pstats.Stats(profile) if stats is None else stats.add(profile)
+            if stats is None:
+                continue
+            path = os.path.join(directory, f"profile-{name}.prof")
+            stats.dump_stats(path)
+            log.info("Wrote %s profile to %s", name, path)
+
+
+def write_atomic(path, text):
+    partial_path = path + ".partial"
+    with open(partial_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(partial_path, path)
+
+
+class MetricsExporter:
+    def __init__(self, metrics, directory=METRICS_DIR, interval=EXPORT_INTERVAL):
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        self.metrics = metrics
+        self.directory = directory
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        return self
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.export()
+
+    def export(self):
+        snapshot = self.metrics.snapshot()
+        write_atomic(os.path.join(self.directory, "metrics.json"), json.dumps(snapshot, indent=2))
+        write_atomic(os.path.join(self.directory, "metrics.prom"), self.metrics.prometheus(snapshot))
+        with open(os.path.join(self.directory, "snapshots.jsonl"), "a", encoding="utf-8") as f:
+            f.write(json.dumps(snapshot) + "\n")
+        return snapshot
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+        snapshot = self.export()
+        if self.metrics.profiling:
+            self.metrics.dump_profiles(self.directory)
+        return snapshot
+
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics():
+    global _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            _metrics = Metrics()
+            if PROFILE:
+                _metrics.enable_profiling()
+        return _metrics
@@ -0,0 +1,43 @@
+import csv
+import os
+
+FLUSH_EVERY = 200
+PARTIAL_SUFFIX = ".partial"
+
+
+class StreamingCSVWriter:
+    def __init__(self, path, fieldnames, flush_every=FLUSH_EVERY):
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self.path = path
+        self.partial_path = path + PARTIAL_SUFFIX
+        self.fieldnames = list(fieldnames)
+        self.flush_every = flush_every
+        self.buffer = []
+        self.count = 0
+        self.file = open(self.partial_path, "w", newline="", encoding="utf-8")
+        self.writer = csv.DictWriter(self.file, fieldnames=self.fieldnames, extrasaction="ignore")
+        self.writer.writeheader()
+        self.file.flush()
+
+    def write(self, row):
+        self.buffer.append(row)
+        self.count += 1
+        if len(self.buffer) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        if self.buffer:
+            self.writer.writerows(self.buffer)
+            self.buffer = []
+        self.file.flush()
+
+    def close(self):
+        if self.file.closed:
+            return self.path
+        self.flush()
+        os.fsync(self.file.fileno())
+        self.file.close()
+        os.replace(self.partial_path, self.path)
+        return self.path
@@ -0,0 +1,64 @@
+import logging
+import math
+import requests
+from initial_state import extract_initial_state
+from metrics import get_metrics
+from rate_limiter import get_rate_limiter
+
+FETCH_MODE_BROWSER = "browser"
+FETCH_MODE_HTTP = "http"
+FETCH_MODE_FARM = "browser-farm"
+FETCH_MODES = (FETCH_MODE_BROWSER, FETCH_MODE_HTTP, FETCH_MODE_FARM)
+
+SEARCH_URL = "https://www.yellowpages.com.au/search/listings?clue={keyword}&locationClue={location}&lat=&lon=&pageNumber={page}"
+PAGE_SIZE = 35
+
+log = logging.getLogger(__name__)
+
+_session = None
+_user_agent = None
+
+
+def check_fetch_mode(fetch_mode):
+    if fetch_mode not in FETCH_MODES:
+        raise ValueError(f"Unknown fetch mode '{fetch_mode}', expected one of {', '.join(FETCH_MODES)}")
+    return fetch_mode
+
+
+def count_pages(pagination, max_records):
+    totalResults = pagination['totalResults'] if pagination['totalResults'] < max_records else max_records
+    return math.ceil(totalResults / PAGE_SIZE)
+
+
+def get_session():
+    global _session, _user_agent
+    if _session is None:
+        from fake_useragent import UserAgent
+
+        _user_agent = UserAgent()
+        _session = requests.Session()
+    return _session
+
+
+def fetch_html(url, timeout=30):
+    session = get_session()
+    headers = {'User-Agent': _user_agent.random}
+    try:
+        res = get_rate_limiter().request(session, url, headers=headers, timeout=timeout)
+    except requests.RequestException as e:
+        log.warning("HTTP fetch failed for %s: %s", url, e)
+        return None
+    if res.status_code != 200:
+        log.warning("HTTP fetch for %s returned status code %s", url, res.status_code)
+        return None
+    return res.text
+
+
+def fetch_initial_state(url):
+    metrics = get_metrics()
+    with metrics.timer("page_fetch_seconds", mode="http"):
+        html_content = fetch_html(url)
+    if not html_content:
+        return None
+    with metrics.timer("state_extract_seconds", source="html"):
+        return extract_initial_state(html_content)
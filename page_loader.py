@@ -0,0 +1,124 @@
+import json
+import time
+
+from PyQt5.QtCore import QTimer, QUrl
+from PyQt5.QtWebEngineCore import QWebEngineUrlRequestInfo, QWebEngineUrlRequestInterceptor
+
+from initial_state import STATE_MARKER, extract_initial_state
+from metrics import get_metrics
+
+STATE_POLL_MS = 100
+BLOCKED_RESOURCE_TYPES = frozenset([
+    QWebEngineUrlRequestInfo.ResourceTypeImage,
+    QWebEngineUrlRequestInfo.ResourceTypeFontResource,
+    QWebEngineUrlRequestInfo.ResourceTypeStylesheet,
+    QWebEngineUrlRequestInfo.ResourceTypeMedia,
+    QWebEngineUrlRequestInfo.ResourceTypeFavicon,
+    QWebEngineUrlRequestInfo.ResourceTypeObject,
+    QWebEngineUrlRequestInfo.ResourceTypePluginResource,
+    QWebEngineUrlRequestInfo.ResourceTypePing,
+    QWebEngineUrlRequestInfo.ResourceTypeCspReport,
+    QWebEngineUrlRequestInfo.ResourceTypePrefetch,
+])
+READ_MARKER = "window.__scraperStateRead"
+# The view is reused between pages, so each document is marked once its state is read. Until the next
+# navigation commits, polling would otherwise hit the previous page and return its state again.
+READ_STATE_JS = (f"(function () {{ if ({READ_MARKER} || !{STATE_MARKER}) return null; "
+                 f"{READ_MARKER} = true; return JSON.stringify({STATE_MARKER}); }})()")
+MARK_READ_JS = f"{READ_MARKER} = true;"
+
+
+class ResourceBlocker(QWebEngineUrlRequestInterceptor):
+    def __init__(self, blocked_types=BLOCKED_RESOURCE_TYPES, parent=None):
+        super().__init__(parent)
+        self.blocked_types = blocked_types
+        self.blocked = 0
+
+    def interceptRequest(self, info):
+        if info.resourceType() in self.blocked_types:
+            self.blocked += 1
+            info.block(True)
+
+
+class PageStateLoader:
+    def __init__(self, browser, on_state, lean=True, rate_limiter=None):
+        self.browser = browser
+        self.on_state = on_state
+        self.lean = lean
+        self.rate_limiter = rate_limiter
+        self.generation = 0
+        self.waiting = False
+        self.url = None
+        self.started = None
+        self.blocker = None
+        if lean:
+            self.blocker = ResourceBlocker(parent=browser)
+            profile = browser.page().profile()
+            if hasattr(profile, "setUrlRequestInterceptor"):
+                profile.setUrlRequestInterceptor(self.blocker)
+            else:
+                profile.setRequestInterceptor(self.blocker)
+        self.poll_timer = QTimer(browser)
+        self.poll_timer.setInterval(STATE_POLL_MS)
+        self.poll_timer.timeout.connect(self.poll_state)
+        browser.loadFinished.connect(self.on_load_finished)
+
+    def load(self, url):
+        self.generation += 1
+        self.waiting = True
+        self.url = url
+        self.started = None
+        wait = self.rate_limiter.reserve(url) if self.rate_limiter is not None else 0
+        if wait > 0:
+            generation = self.generation
+            QTimer.singleShot(int(wait * 1000), lambda: self.start_load(generation, url))
+        else:
+            self.start_load(self.generation, url)
+
+    def start_load(self, generation, url):
+        if generation != self.generation:
+            return
+        self.started = time.monotonic()
+        self.browser.load(QUrl(url))
+        if self.lean:
+            self.poll_timer.start()
+
+    def poll_state(self):
+        generation = self.generation
+        self.browser.page().runJavaScript(READ_STATE_JS, lambda result: self.on_polled_state(generation, result))
+
+    def on_polled_state(self, generation, result):
+        if generation != self.generation or not self.waiting or not result:
+            return
+        try:
+            with get_metrics().timer("state_extract_seconds", source="javascript"):
+                json_data = json.loads(result)
+        except ValueError:
+            return
+        if isinstance(json_data, dict):
+            # The state is all we need, so stop the remaining subresource loads.
+            self.browser.stop()
+            self.deliver(json_data)
+
+    def on_load_finished(self, ok):
+        if not self.waiting or self.started is None:
+            return
+        generation = self.generation
+        self.browser.page().toHtml(lambda html_content: self.on_html(generation, html_content))
+
+    def on_html(self, generation, html_content):
+        if generation == self.generation and self.waiting:
+            with get_metrics().timer("state_extract_seconds", source="html"):
+                json_data = extract_initial_state(html_content)
+            self.deliver(json_data)
+
+    def deliver(self, json_data):
+        self.waiting = False
+        self.poll_timer.stop()
+        self.browser.page().runJavaScript(MARK_READ_JS)
+        get_metrics().observe("page_render_seconds", time.monotonic() - self.started, mode="browser")
+        if self.rate_limiter is not None:
+            # A page without state is usually a block or error page, so it counts as a throttle signal.
+            self.rate_limiter.record(self.url, 200 if json_data is not None else None,
+                                     time.monotonic() - self.started)
+        self.on_state(json_data)
@@ -0,0 +1,125 @@
+import queue
+import threading
+import time
+
+EVENT_PROGRESS = "progress"
+EVENT_ROWS = "rows"
+EVENT_FINISHED = "finished"
+ROW_BATCH = 25
+PREVIEW_ROWS = 200
+
+
+class ProgressChannel:
+    def __init__(self, keyword_count=0, row_batch=ROW_BATCH):
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.row_batch = row_batch
+        self.started_at = time.time()
+        self.keyword_count = keyword_count
+        self.keyword_pages = {}
+        self.pages_done = 0
+        self.pages_failed = 0
+        self.pages_skipped = 0
+        self.rows_parsed = 0
+        self.rows_finished = 0
+        self.abns_resolved = 0
+        self.pending_rows = []
+        self.finished = False
+
+    @property
+    def pages_total(self):
+        unknown = max(self.keyword_count - len(self.keyword_pages), 0)
+        return unknown + sum(self.keyword_pages.values())
+
+    def snapshot(self):
+        elapsed = time.time() - self.started_at
+        pages_total = self.pages_total
+        completed = self.pages_done + self.pages_failed
+        remaining = max(pages_total - completed - self.pages_skipped, 0)
+        eta = elapsed / completed * remaining if completed else None
+        return {
+            "type": EVENT_PROGRESS,
+            "pages_done": self.pages_done + self.pages_skipped,
+            "pages_failed": self.pages_failed,
+            "pages_total": pages_total,
+            "rows_parsed": self.rows_parsed,
+            "rows_finished": self.rows_finished,
+            "abns_resolved": self.abns_resolved,
+            "elapsed": elapsed,
+            "eta": eta,
+        }
+
+    def page_skipped(self, keyword, total_pages):
+        with self.lock:
+            self.keyword_pages.setdefault(keyword, total_pages)
+            self.pages_skipped += 1
+
+    def page_done(self, keyword, total_pages, rows_parsed):
+        with self.lock:
+            self.keyword_pages.setdefault(keyword, total_pages)
+            self.pages_done += 1
+            self.rows_parsed += rows_parsed
+            self.queue.put(self.snapshot())
+
+    def page_failed(self):
+        with self.lock:
+            self.pages_failed += 1
+            self.queue.put(self.snapshot())
+
+    def row_done(self, row):
+        with self.lock:
+            self.rows_finished += 1
+            if row is not None:
+                self.abns_resolved += 1
+                self.pending_rows.append(dict(row.items()))
+            if len(self.pending_rows) >= self.row_batch:
+                self.flush_rows()
+
+    def flush_rows(self):
+        if self.pending_rows:
+            self.queue.put({"type": EVENT_ROWS, "rows": self.pending_rows})
+            self.pending_rows = []
+            self.queue.put(self.snapshot())
+
+    def finish(self, filename=None):
+        with self.lock:
+            self.flush_rows()
+            self.finished = True
+            event = self.snapshot()
+            event.update(type=EVENT_FINISHED, filename=filename)
+            self.queue.put(event)
+
+    def events(self, alive=None, poll=0.5):
+        while True:
+            try:
+                event = self.queue.get(timeout=poll)
+            except queue.Empty:
+                if alive is not None and not alive():
+                    return
+                continue
+            yield event
+            if event["type"] == EVENT_FINISHED:
+                return
+
+
+def follow_scrape(scraper, channel, st):
+    import pandas as pd
+
+    status = st.empty()
+    progress_bar = st.progress(0)
+    preview = st.empty()
+    rows = []
+    filename = None
+    for event in channel.events(alive=scraper.isRunning):
+        if event["type"] == EVENT_ROWS:
+            rows.extend(event["rows"])
+            preview.dataframe(pd.DataFrame(rows[-PREVIEW_ROWS:]))
+            continue
+        pages_finished = event["pages_done"] + event["pages_failed"]
+        progress_bar.progress(min(pages_finished / max(event["pages_total"], 1), 1.0))
+        eta = f", about {event['eta']:.0f}s left" if event["eta"] is not None else ""
+        status.text(f"Pages {pages_finished}/{event['pages_total']}, {event['rows_parsed']} listings parsed, "
+                    f"{event['abns_resolved']} ABNs resolved{eta}")
+        if event["type"] == EVENT_FINISHED:
+            filename = event["filename"]
+    return filename
@@ -1,39 +1,26 @@
 import base64
+import logging
 import os
 import streamlit as st
-import time
-import seaborn as sns
-from PyQt5.QtWebEngineWidgets import QWebEngineView
-from wordcloud import WordCloud
-from textblob import TextBlob
 import pandas as pd
-import matplotlib.pyplot as plt
-from nltk.tokenize import word_tokenize
-from nltk.corpus import stopwords
-import string
-from YellowPagesScraper import Scraper
-import numpy as np
-from spellchecker import SpellChecker
-from nltk.corpus import wordnet
-import nltk
-
-nltk.download("wordnet")
+from page_fetcher import FETCH_MODES
+from progress import ProgressChannel, follow_scrape
+from analysis_cache import frame_hash, get_cache
+from keyword_expansion import DEFAULT_FAN_OUT, MAX_SYNONYMS, get_expander
+from metrics import configure_logging
+
 from pathlib import Path
 
 scraper_thread = None
 data_dir = "data"
 
+log = logging.getLogger(__name__)
+configure_logging()
+
 if not os.path.exists(data_dir):
     os.makedirs(data_dir)
 
 
-def perform_sentiment_analysis(text):
-    if isinstance(text, str):
-        analysis = TextBlob(text)
-        return analysis.sentiment.polarity
-    return np.nan
-
-
 def extract_email_domain(email):
     if pd.notna(email):
         parts = email.split('@')
@@ -42,40 +29,25 @@ def extract_email_domain(email):
     return None
 
 
-def preprocess_text(text):
-    if not pd.isna(text):
-        tokens = word_tokenize(text.lower())
-        tokens = [word for word in tokens if word not in string.punctuation]
-        tokens = [word for word in tokens if word not in stopwords.words('english')]
-        return " ".join(tokens)
-    else:
-        return ""
-
-
-def get_related_keywords(keywords, top_n=5):
-    related_keywords_dict = {}
-    list_of_keywords = set()
-    for keyword in keywords:
-        synonyms = set()
-        list_of_keywords.add(keyword)
-        for syn in wordnet.synsets(keyword):
-            for lemma in syn.lemmas():
-                synonym = lemma.name()
-                if synonym.lower() not in list_of_keywords:
-                    synonyms.add(synonym)
-        synonyms.add(keyword)
-        related_keywords_dict[keyword] = list(synonyms)[:top_n]
-        list_of_keywords.update(synonyms)
-    list_of_keywords = list(list_of_keywords)
-    print(list_of_keywords)
-    print(related_keywords_dict)
+def get_related_keywords(keywords, top_n=DEFAULT_FAN_OUT):
+    expander = get_expander()
+    related_keywords_dict, list_of_keywords = expander.related_keywords(keywords, top_n)
+    if expander.missing:
+        st.warning("Synonym index not found, so keywords were not expanded. "
+                   "Build it with: python keyword_expansion.py")
+    log.debug("Searching keywords: %s", list_of_keywords)
+    log.debug("Related keywords: %s", related_keywords_dict)
     return related_keywords_dict, list_of_keywords
 
 
 def eda(data):
+    import matplotlib.pyplot as plt
+
+    cache = get_cache()
+    data_hash = frame_hash(data)
     st.title("Exploratory Data Analysis (EDA)")
     st.write("## Summary Statistics")
-    st.write(data.describe())
+    st.write(cache.stage("describe", data_hash, data.describe))
 
     st.write("## Data Visualization")
     st.subheader("Histogram for 'postCode'")
@@ -94,11 +66,13 @@ def eda(data):
     st.write(unique_domains)
 
     st.subheader("Email Domain Counts")
-    domain_counts = df['email_domain'].value_counts()
+    domain_counts = cache.stage("email_domain_counts", data_hash, df['email_domain'].value_counts)
     st.bar_chart(domain_counts)
 
 
 def check_misspelled_keywords(keywords):
+    from spellchecker import SpellChecker
+
     spell = SpellChecker()
     misspelled = spell.unknown(keywords)
     suggestions = {keyword: spell.candidates(keyword) for keyword in misspelled}
@@ -106,6 +80,9 @@ def check_misspelled_keywords(keywords):
 
 
 def nlp(df, keywords):
+    from term_index import render_word_cloud
+    from text_processing import preprocess_texts
+
     st.header("Natural Language Processing Analysis")
     misspelled_keywords, suggestions = check_misspelled_keywords(keywords)
     if misspelled_keywords:
@@ -119,13 +96,15 @@ def nlp(df, keywords):
             suggestions_table = pd.DataFrame(data)
             st.write(suggestions_table)
 
-    df['cleaned_description'] = df['description'].apply(preprocess_text)
-    df['reviews'] = df['review'].apply(preprocess_text)
+    cache = get_cache()
+    df['cleaned_description'] = cache.map_texts("preprocess", df['description'], preprocess_texts, batch=True)
+    df['reviews'] = cache.map_texts("preprocess", df['review'], preprocess_texts, batch=True)
     descriptions = df['cleaned_description'].dropna()
 
     st.subheader("Descriptions Word Cloud")
-    wordcloud = WordCloud(width=800, height=400, background_color="white").generate(" ".join(descriptions))
-    st.image(wordcloud.to_array())
+    wordcloud = render_word_cloud(cache, descriptions)
+    if wordcloud is not None:
+        st.image(wordcloud)
 
 
 def create_dataframe_download_link(dataframe, filename):
@@ -145,13 +124,16 @@ for key in key_list:
     kw = key.strip()
     if kw:
         keywords.append(kw)
+fan_out = st.sidebar.number_input("Search terms per keyword (including the keyword itself)", min_value=1,
+                                  max_value=MAX_SYNONYMS + 1, value=DEFAULT_FAN_OUT)
 st.sidebar.header("Data Filters")
 postcode_filter = st.sidebar.text_input("Enter Postcode (optional):")
 number_of_records = st.sidebar.text_input("Enter Records (optional):")
+fetch_mode = st.sidebar.selectbox("Fetch mode", FETCH_MODES)
 new_scrape = st.sidebar.checkbox("New Scrape")
 if st.sidebar.button("Start"):
     csv_files = [f for f in os.listdir("data") if f.endswith(".csv")]
-    print(csv_files)
+    log.debug("Existing result files: %s", csv_files)
     if (not keywords and new_scrape) or (not keywords and not csv_files):
         st.warning("Please enter at least one keyword.")
     else:
@@ -163,42 +145,43 @@ if st.sidebar.button("Start"):
                     os.remove(file_path)
 
         if keywords:
-            keywords_data, keywords = get_related_keywords(keywords)
-            related_df = pd.DataFrame(keywords_data)
+            keywords_data, keywords = get_related_keywords(keywords, int(fan_out))
+            related_df = pd.DataFrame({keyword: pd.Series(related) for keyword, related in keywords_data.items()})
             st.write(related_df)
             st.markdown(create_dataframe_download_link(related_df, "related_keywords.csv"), unsafe_allow_html=True)
             st.info(f"Scraping data for keywords: {', '.join(keywords)}")
+        first_csv_file = None
         with st.spinner("Scraping data please wait"):
             if new_scrape or not csv_files:
-                scraper = Scraper(keywords)
+                progress = ProgressChannel(len(keywords))
+                from YellowPagesScraper import Scraper
+                scraper = Scraper(keywords, fetch_mode=fetch_mode, progress=progress)
                 scraper_thread = scraper
                 scraper.start()
-            while True:
-                csv_files = [f for f in os.listdir("data") if f.endswith(".csv")]
+                filename = follow_scrape(scraper, progress, st)
+                if filename:
+                    first_csv_file = os.path.basename(filename)
+            else:
                 sorted_csv_files = sorted(csv_files, key=lambda x: Path(data_dir, x).stat().st_ctime, reverse=True)
-                if csv_files:
-                    first_csv_file = sorted_csv_files[0]
-                    if scraper and scraper.isRunning():
-                        scraper.quit()
-                        scraper.terminate()
-                    break
-                time.sleep(1)
+                first_csv_file = sorted_csv_files[0]
+        if first_csv_file is None:
+            st.warning("The scraper stopped before saving any data.")
+            st.stop()
 
         try:
-            scraped_data = pd.read_csv(f"data/{first_csv_file}")
-            df = pd.DataFrame(scraped_data)
-            df = df[['name', 'abn'] + [col for col in df.columns if col not in ['name', 'abn']]]
-            if postcode_filter:
-                df = df[df['postCode'] == int(postcode_filter)]
+            from dataset_store import load_results
+            from sentiment import sentiment_scores
 
-            if number_of_records:
-                df = df.head(int(number_of_records))
+            df = load_results(f"data/{first_csv_file}", postcode=int(postcode_filter) if postcode_filter else None,
+                              limit=int(number_of_records) if number_of_records else None)
+            df = df[['name', 'abn'] + [col for col in df.columns if col not in ['name', 'abn']]]
             df['email_domain'] = df['email'].apply(extract_email_domain)
-            df['sentiment'] = df['review'].apply(perform_sentiment_analysis)
+            df['sentiment'] = sentiment_scores(get_cache(), df['review'])
             st.write(df)
             st.markdown(create_dataframe_download_link(df, "scraped_data.csv"), unsafe_allow_html=True)
             eda(df)
             nlp(df, keywords)
+            get_cache().flush()
         except Exception as ex:
-            print(ex)
+            log.exception("Loading results failed")
             st.warning(f"Something went wrong getting error: {ex}")
@@ -0,0 +1,150 @@
+import email.utils
+import logging
+import random
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+
+INITIAL_RATE = 2.0
+MIN_RATE = 0.2
+MAX_RATE = 20.0
+BURST = 4
+RATE_INCREASE = 0.25
+BACKOFF_FACTOR = 0.5
+SLOW_FACTOR = 0.9
+LATENCY_TARGET = 3.0
+MAX_RETRIES = 3
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 30.0
+RETRY_STATUSES = frozenset([429, 500, 502, 503, 504])
+
+log = logging.getLogger(__name__)
+
+
+def parse_retry_after(value):
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+class HostBucket:
+    def __init__(self, rate=INITIAL_RATE, min_rate=MIN_RATE, max_rate=MAX_RATE, burst=BURST,
+                 latency_target=LATENCY_TARGET):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.latency_target = latency_target
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.latency = None
+        self.throttled = 0
+        self.lock = threading.Lock()
+
+    def reserve(self):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            return max(wait, self.blocked_until - now)
+
+    def on_success(self, latency):
+        with self.lock:
+            self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+            if self.latency > self.latency_target:
+                self.rate = max(self.min_rate, self.rate * SLOW_FACTOR)
+            else:
+                self.rate = min(self.max_rate, self.rate + RATE_INCREASE)
+
+    def on_throttle(self, retry_after=None):
+        with self.lock:
+            self.throttled += 1
+            self.rate = max(self.min_rate, self.rate * BACKOFF_FACTOR)
+            if retry_after:
+                self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+
+
+class RateLimiter:
+    def __init__(self, max_retries=MAX_RETRIES, backoff_base=BACKOFF_BASE, backoff_cap=BACKOFF_CAP, **bucket_options):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.bucket_options = bucket_options
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def bucket(self, url):
+        host = urlparse(url).netloc
+        with self.lock:
+            if host not in self.buckets:
+                self.buckets[host] = HostBucket(**self.bucket_options)
+            return self.buckets[host]
+
+    def reserve(self, url):
+        return self.bucket(url).reserve()
+
+    def acquire(self, url):
+        wait = self.reserve(url)
+        if wait > 0:
+            time.sleep(wait)
+
+    def record(self, url, status, latency, retry_after=None):
+        if status is None or status in RETRY_STATUSES:
+            self.bucket(url).on_throttle(retry_after)
+        else:
+            self.bucket(url).on_success(latency)
+
+    def backoff(self, attempt, retry_after=None):
+        if retry_after is not None:
+            return retry_after
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+
+    def request(self, session, url, **kwargs):
+        for attempt in range(self.max_retries + 1):
+            self.acquire(url)
+            start = time.monotonic()
+            try:
+                response = session.get(url, **kwargs)
+            except requests.RequestException:
+                self.record(url, None, time.monotonic() - start)
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(self.backoff(attempt))
+                continue
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            self.record(url, response.status_code, time.monotonic() - start, retry_after)
+            if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                return response
+            log.info("%s returned status code %s, retrying.", url, response.status_code)
+            time.sleep(self.backoff(attempt, retry_after))
+
+    def stats(self):
+        with self.lock:
+            buckets = dict(self.buckets)
+        return {host: {"rate": bucket.rate, "latency": bucket.latency, "throttled": bucket.throttled}
+                for host, bucket in buckets.items()}
+
+
+_rate_limiter = None
+_rate_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    global _rate_limiter
+    with _rate_limiter_lock:
+        if _rate_limiter is None:
+            _rate_limiter = RateLimiter()
+        return _rate_limiter
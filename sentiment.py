@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+from textblob import TextBlob
+
+from text_processing import map_chunks
+
+SENTIMENT_STAGE = "sentiment"
+POSITIVE = "Positive"
+NEGATIVE = "Negative"
+NEUTRAL = "Neutral"
+
+
+def perform_sentiment_analysis(text):
+    if isinstance(text, str):
+        analysis = TextBlob(text)
+        return analysis.sentiment.polarity
+    return np.nan
+
+
+def score_chunk(texts):
+    return [perform_sentiment_analysis(text) for text in texts]
+
+
+def score_texts(texts):
+    return map_chunks(score_chunk, texts)
+
+
+def sentiment_scores(cache, series):
+    return cache.map_texts(SENTIMENT_STAGE, series, score_texts, batch=True)
+
+
+def sentiment_label(score):
+    return POSITIVE if score > 0 else NEGATIVE if score < 0 else NEUTRAL
+
+
+def sentiment_counts(scores):
+    return pd.Series([sentiment_label(score) for score in scores.dropna()]).value_counts()
@@ -0,0 +1,45 @@
+from collections import Counter
+
+import pandas as pd
+from wordcloud import WordCloud
+
+TERM_INDEX_STAGE = "term_index"
+WORD_CLOUD_WORDS = 200
+
+
+class TermFrequencyIndex:
+    def __init__(self, texts=()):
+        self.counts = Counter()
+        self.documents = 0
+        self.update(texts)
+
+    def update(self, texts):
+        for text in texts:
+            if isinstance(text, str) and text:
+                self.counts.update(text.lower().split())
+                self.documents += 1
+
+    def most_common(self, n=20):
+        pairs = self.counts.most_common(n)
+        return pd.Series([count for _, count in pairs], index=[term for term, _ in pairs], dtype="int64")
+
+    def frequencies(self, n=WORD_CLOUD_WORDS):
+        return dict(self.counts.most_common(n))
+
+    def __len__(self):
+        return len(self.counts)
+
+
+def term_index(cache, series):
+    return cache.stage(TERM_INDEX_STAGE, series, lambda: TermFrequencyIndex(series.values))
+
+
+def render_word_cloud(cache, series, width=800, height=400, background_color="white"):
+    def compute():
+        frequencies = term_index(cache, series).frequencies()
+        if not frequencies:
+            return None
+        return WordCloud(width=width, height=height, background_color=background_color,
+                         max_words=WORD_CLOUD_WORDS).generate_from_frequencies(frequencies).to_array()
+
+    return cache.stage("wordcloud", series, compute, width=width, height=height, background_color=background_color)
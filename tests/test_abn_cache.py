@@ -0,0 +1,81 @@
+import os
+import sys
+import types
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import abn_cache
+from abn_cache import MISSING, SOURCE_ABR, SOURCE_YELLOW, ABNCache, name_key
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+def open_cache(tmp_path, monkeypatch, **kwargs):
+    clock = Clock()
+    monkeypatch.setattr(abn_cache, "time", types.SimpleNamespace(time=clock.time))
+    return ABNCache(str(tmp_path / "cache" / "abn.sqlite3"), **kwargs), clock
+
+
+def test_hit_miss_and_sources(tmp_path, monkeypatch):
+    cache, _ = open_cache(tmp_path, monkeypatch)
+    try:
+        assert cache.get(SOURCE_YELLOW, "https://example.com/a") is MISSING
+        cache.put(SOURCE_YELLOW, "https://example.com/a", "11111111111")
+        assert cache.get(SOURCE_YELLOW, "https://example.com/a") == "11111111111"
+        assert cache.get(SOURCE_ABR, "https://example.com/a") is MISSING
+        assert cache.stats()[SOURCE_YELLOW] == {"hits": 1, "misses": 1, "hit_rate": 0.5}
+    finally:
+        cache.close()
+
+
+def test_positive_and_negative_ttl(tmp_path, monkeypatch):
+    cache, clock = open_cache(tmp_path, monkeypatch, ttl=100, negative_ttl=10)
+    try:
+        cache.put(SOURCE_ABR, name_key("Acme Plumbing", "2000"), "11111111111")
+        cache.put(SOURCE_ABR, name_key("Bright Sparks", "3000"), None)
+        assert cache.get(SOURCE_ABR, name_key("ACME plumbing!", "2000")) == "11111111111"
+        assert cache.get(SOURCE_ABR, name_key("Bright Sparks", "3000")) is None
+
+        clock.now += 50
+        assert cache.get(SOURCE_ABR, name_key("Acme Plumbing", "2000")) == "11111111111"
+        assert cache.get(SOURCE_ABR, name_key("Bright Sparks", "3000")) is MISSING
+
+        clock.now += 100
+        assert cache.get(SOURCE_ABR, name_key("Acme Plumbing", "2000")) is MISSING
+    finally:
+        cache.close()
+
+
+def test_evicts_least_recently_used(tmp_path, monkeypatch):
+    monkeypatch.setattr(abn_cache, "EVICT_EVERY", 1)
+    cache, clock = open_cache(tmp_path, monkeypatch, max_entries=2)
+    try:
+        for key in ("a", "b"):
+            cache.put(SOURCE_YELLOW, key, key.upper())
+            clock.now += 1
+        assert cache.get(SOURCE_YELLOW, "a") == "A"
+        clock.now += 1
+        cache.put(SOURCE_YELLOW, "c", "C")
+
+        assert cache.get(SOURCE_YELLOW, "b") is MISSING
+        assert cache.get(SOURCE_YELLOW, "a") == "A"
+        assert cache.get(SOURCE_YELLOW, "c") == "C"
+    finally:
+        cache.close()
+
+
+def test_entries_survive_reopen(tmp_path, monkeypatch):
+    cache, _ = open_cache(tmp_path, monkeypatch)
+    cache.put(SOURCE_YELLOW, "https://example.com/a", "11111111111")
+    cache.close()
+    cache, _ = open_cache(tmp_path, monkeypatch)
+    try:
+        assert cache.get(SOURCE_YELLOW, "https://example.com/a") == "11111111111"
+    finally:
+        cache.close()
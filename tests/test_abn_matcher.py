@@ -0,0 +1,42 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from abn_matcher import CandidateIndex
+
+
+def candidate(abn, name, postcode="2000", state="NSW", is_current=True):
+    return {"ABN": abn, "Name": name, "Postcode": postcode, "State": state, "IsCurrent": is_current}
+
+
+def test_best_match_prefers_closest_name():
+    index = CandidateIndex([candidate("1", "Delta Plumbing"), candidate("2", "Acme Plumbing Co"),
+                            candidate("3", "Acme Electrical")])
+    assert index.best_match("Acme Plumbing", "2000", "NSW")["ABN"] == "2"
+
+
+def test_threshold_applies_before_location_boost():
+    weak = candidate("1", "Acme Electrical Services", postcode="2000", state="NSW")
+    eligible = candidate("2", "Acme Electrical", postcode="3000", state="VIC")
+    index = CandidateIndex([weak, eligible])
+    similarity = index.similarity("Acme Plumbing")
+    assert similarity[0] < 0.35 <= similarity[1]
+
+    assert index.best_match("Acme Plumbing", "2000", "NSW")["ABN"] == "2"
+    assert CandidateIndex([weak]).best_match("Acme Plumbing", "2000", "NSW") is None
+
+
+def test_ties_prefer_current_then_first_candidate():
+    index = CandidateIndex([candidate("1", "Acme Plumbing", is_current=False), candidate("2", "Acme Plumbing"),
+                            candidate("3", "Acme Plumbing")])
+    assert index.best_match("Acme Plumbing", "2000", "NSW")["ABN"] == "2"
+
+    index = CandidateIndex([candidate("1", "Acme Plumbing", is_current=False),
+                            candidate("2", "Acme Plumbing", is_current=False)])
+    assert index.best_match("Acme Plumbing", "2000", "NSW")["ABN"] == "1"
+
+
+def test_no_candidates_or_empty_name():
+    assert CandidateIndex([]).best_match("Acme Plumbing") is None
+    assert CandidateIndex([candidate("1", "Acme Plumbing")]).best_match("") is None
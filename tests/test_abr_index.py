@@ -0,0 +1,98 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import abr_index
+from abr_index import ABRIndex
+
+
+def abr_record(abn, name, updated, postcode="2000", state="NSW", status="ACT", trading_name=None):
+    other = ""
+    if trading_name:
+        other = f"<OtherEntity><NonIndividualName><NonIndividualNameText>{trading_name}</NonIndividualNameText>" \
+                f"</NonIndividualName></OtherEntity>"
+    return (f"<ABR recordLastUpdatedDate=\"{updated}\"><ABN status=\"{status}\">{abn}</ABN><MainEntity>"
+            f"<NonIndividualName><NonIndividualNameText>{name}</NonIndividualNameText></NonIndividualName>"
+            f"<BusinessAddress><AddressDetails><State>{state}</State><Postcode>{postcode}</Postcode></AddressDetails>"
+            f"</BusinessAddress></MainEntity>{other}</ABR>")
+
+
+def write_extract(path, *records):
+    path.write_text("<Transfer>" + "".join(records) + "</Transfer>")
+    return str(path)
+
+
+def test_ingest_and_lookup(tmp_path):
+    extract = write_extract(tmp_path / "extract1.xml",
+                            abr_record("11111111111", "ACME PLUMBING PTY LTD", "20200101"),
+                            abr_record("22222222222", "BRIGHT SPARKS ELECTRICAL", "20200101", postcode="3000",
+                                       state="VIC", trading_name="Bright Sparks"))
+    index = ABRIndex(str(tmp_path / "index.sqlite3"))
+    try:
+        assert index.ingest(extract) == {"read": 2, "inserted": 2, "updated": 0, "unchanged": 0}
+        assert len(index) == 2
+        assert [c["ABN"] for c in index.candidates("Acme Plumbing", "2000", "NSW")] == ["11111111111"]
+        assert [c["ABN"] for c in index.candidates("Bright Sparks", "3000", "VIC")] == ["22222222222"] * 2
+
+        assert index.ingest(extract) == {"read": 2, "inserted": 0, "updated": 0, "unchanged": 2}
+
+        newer = write_extract(tmp_path / "extract2.xml",
+                              abr_record("11111111111", "ACME PLUMBING AND GAS PTY LTD", "20210101", postcode="2150"),
+                              abr_record("22222222222", "BRIGHT SPARKS ELECTRICAL", "20200101", postcode="3000",
+                                         state="VIC", trading_name="Bright Sparks"))
+        assert index.ingest(newer) == {"read": 2, "inserted": 0, "updated": 1, "unchanged": 1}
+        assert index.candidates("Acme Plumbing", "2000", "NSW") == [{
+            "ABN": "11111111111", "Name": "ACME PLUMBING AND GAS PTY LTD", "State": "NSW", "Postcode": "2150",
+            "IsCurrent": True}]
+    finally:
+        index.close()
+
+
+def test_token_lookup(tmp_path):
+    extract = write_extract(tmp_path / "extract.xml",
+                            abr_record("11111111111", "ACME PLUMBING", "20200101"),
+                            abr_record("33333333333", "ACME PLUMBING", "20200101", postcode="6000", state="WA"),
+                            abr_record("44444444444", "ZENITH ROOFING", "20200101"))
+    index = ABRIndex(str(tmp_path / "index.sqlite3"))
+    try:
+        index.ingest(extract)
+        assert [c["ABN"] for c in index.candidates("Acme Plumbing Services", "2000", "NSW")] == ["11111111111"]
+        assert index.candidates("Harbour Electrical", "2000", "NSW") == []
+    finally:
+        index.close()
+
+
+def lookup_steps(index, name):
+    steps = [0]
+
+    def count():
+        steps[0] += 1
+
+    index.conn.set_progress_handler(count, 100)
+    try:
+        candidates = index.candidates(name, "2000", "NSW")
+    finally:
+        index.conn.set_progress_handler(None, 100)
+    return candidates, steps[0]
+
+
+def test_common_token_lookup_is_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(abr_index, "MAX_TOKEN_ROWS", 50)
+    index = ABRIndex(str(tmp_path / "index.sqlite3"))
+    try:
+        index.ingest(write_extract(tmp_path / "small.xml", abr_record("99999999999", "ACME SERVICES", "20200101"),
+                                   *[abr_record(f"1{i:010d}", f"TRADER{i} SERVICES", "20200101")
+                                     for i in range(100)]))
+        candidates, small_steps = lookup_steps(index, "Acme Cleaning Services")
+        assert candidates[0]["ABN"] == "99999999999"
+        assert len(index.candidates("Harbour Services", "2000", "NSW")) == abr_index.MAX_CANDIDATES
+
+        index.ingest(write_extract(tmp_path / "large.xml", *[abr_record(f"2{i:010d}", f"VENDOR{i} SERVICES", "20200101")
+                                                             for i in range(2000)]))
+        candidates, large_steps = lookup_steps(index, "Acme Cleaning Services")
+        assert candidates[0]["ABN"] == "99999999999"
+        assert large_steps < small_steps * 2
+        assert len(index.candidates("Harbour Services", "2000", "NSW")) == abr_index.MAX_CANDIDATES
+    finally:
+        index.close()
@@ -0,0 +1,67 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from checkpoint import CrawlCheckpoint
+
+KEYWORDS = ["acid", "resin"]
+
+
+def test_resume_replays_completed_pages_only(tmp_path):
+    checkpoint = CrawlCheckpoint(KEYWORDS, directory=str(tmp_path))
+    timestamp = checkpoint.timestamp
+    checkpoint.start_page("acid", 1, 3, 2, duplicates=[{"name": "Acme"}])
+    checkpoint.row_done("acid", 1, {"name": "Bright"})
+    checkpoint.row_done("acid", 1, {"name": "Delta"})
+    checkpoint.start_page("acid", 2, 3, 2, duplicates=[{"name": "Zeta"}])
+    checkpoint.row_done("acid", 2, {"name": "Echo"})
+    checkpoint.close()
+
+    resumed = CrawlCheckpoint(KEYWORDS, directory=str(tmp_path))
+    try:
+        assert resumed.resumed
+        assert resumed.timestamp == timestamp
+        assert resumed.is_done("acid", 1)
+        assert not resumed.is_done("acid", 2)
+        assert resumed.page_count("acid") == 3
+        assert list(resumed.iter_rows()) == [{"name": "Bright"}, {"name": "Delta"}]
+        assert list(resumed.iter_duplicates()) == [("acid", {"name": "Acme"})]
+
+        resumed.start_page("acid", 2, 3, 1)
+        resumed.row_done("acid", 2, {"name": "Echo"})
+        assert resumed.is_done("acid", 2)
+        assert [row["name"] for row in resumed.iter_rows()] == ["Bright", "Delta", "Echo"]
+    finally:
+        resumed.close()
+
+
+def test_failed_pages_stay_open(tmp_path):
+    checkpoint = CrawlCheckpoint(KEYWORDS, directory=str(tmp_path))
+    checkpoint.start_page("resin", 1, 2, 2)
+    checkpoint.row_done("resin", 1, {"name": "Acme"})
+    checkpoint.row_done("resin", 1, None, failed=True)
+    checkpoint.page_failed("resin", 2)
+    assert not checkpoint.is_done("resin", 1)
+    assert sorted(checkpoint.failed_pages()) == [("resin", 1), ("resin", 2)]
+    checkpoint.close()
+
+    resumed = CrawlCheckpoint(KEYWORDS, directory=str(tmp_path))
+    try:
+        assert resumed.completed_pages() == []
+        assert list(resumed.iter_rows()) == []
+    finally:
+        resumed.close()
+
+
+def test_empty_page_completes_and_finish_removes_checkpoint(tmp_path):
+    checkpoint = CrawlCheckpoint(KEYWORDS, directory=str(tmp_path))
+    checkpoint.start_page("acid", 1, 1, 0)
+    assert checkpoint.is_done("acid", 1)
+    checkpoint.finish()
+    assert not os.path.exists(checkpoint.path)
+    fresh = CrawlCheckpoint(KEYWORDS, directory=str(tmp_path))
+    try:
+        assert not fresh.resumed
+    finally:
+        fresh.close()
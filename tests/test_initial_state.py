@@ -0,0 +1,24 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from initial_state import extract_initial_state
+
+
+def test_extracts_state_from_script():
+    html = '<script>window.__INITIAL_STATE__ = {"model": {"inAreaResultViews": []}, "text": "a;b</script>"};' \
+           '\nwindow.other = 1;</script>'
+    assert extract_initial_state(html) == {"model": {"inAreaResultViews": []}, "text": "a;b</script>"}
+
+
+def test_skips_references_without_assignment():
+    html = '<script>if (window.__INITIAL_STATE__) {}</script><script>window.__INITIAL_STATE__={"page": 2}</script>'
+    assert extract_initial_state(html) == {"page": 2}
+
+
+def test_missing_or_invalid_state():
+    assert extract_initial_state(None) is None
+    assert extract_initial_state("<html></html>") is None
+    assert extract_initial_state("window.__INITIAL_STATE__ = {broken") is None
+    assert extract_initial_state("window.__INITIAL_STATE__ = [1, 2]") is None
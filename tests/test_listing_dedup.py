@@ -0,0 +1,45 @@
+import csv
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from listing_dedup import ListingDeduplicator, key_fields, listing_keys
+
+
+def read_matches(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return [(row["name"], row["keyword"]) for row in csv.DictReader(f)]
+
+
+def test_listing_keys_normalize_link_phone_and_address():
+    row = {"detailsLink": "https://www.Example.com/Acme/", "name": "ACME Plumbing", "phone": "(02) 9876 5432",
+           "address": "1 George St"}
+    assert listing_keys(row) == ["link:www.example.com/acme", "phone:0298765432|acme plumbing",
+                                 "address:1 george st|acme plumbing"]
+    assert listing_keys({"name": "Acme", "phone": "123"}) == []
+
+
+def test_duplicates_across_keywords(tmp_path):
+    path = str(tmp_path / "matches.csv")
+    dedup = ListingDeduplicator(path)
+    assert dedup.add({"detailsLink": "https://example.com/acme", "name": "Acme"}, "acid")
+    assert not dedup.add({"detailsLink": "https://example.com/acme/", "name": "Acme Pty"}, "resin")
+    assert not dedup.add({"name": "Acme", "phone": "0298765432", "detailsLink": "https://example.com/acme"}, "acid")
+    assert dedup.add({"name": "Bright", "phone": "0298765432"}, "acid")
+    dedup.close()
+
+    assert (dedup.unique, dedup.duplicates) == (2, 2)
+    assert read_matches(path) == [("Acme", "acid"), ("Acme", "resin"), ("Bright", "acid")]
+
+
+def test_replayed_match_waits_for_its_listing(tmp_path):
+    path = str(tmp_path / "matches.csv")
+    dedup = ListingDeduplicator(path)
+    acme = {"detailsLink": "https://example.com/acme", "name": "Acme", "phone": None, "address": None}
+    dedup.add_match(key_fields(acme), "resin")
+    assert dedup.add(acme, "acid")
+    dedup.add_match(key_fields(acme), "solvent")
+    dedup.close()
+
+    assert read_matches(path) == [("Acme", "resin"), ("Acme", "acid"), ("Acme", "solvent")]
@@ -0,0 +1,61 @@
+import atexit
+import multiprocessing
+import os
+import string
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+from nltk.corpus import stopwords
+from nltk.tokenize import word_tokenize
+
+PUNCTUATION = string.punctuation
+CHUNK_ROWS = 2000
+MIN_PARALLEL_ROWS = 5000
+
+_stop_words = None
+_executor = None
+
+
+def stop_words():
+    global _stop_words
+    if _stop_words is None:
+        _stop_words = frozenset(stopwords.words('english'))
+    return _stop_words
+
+
+def preprocess_text(text):
+    if pd.isna(text):
+        return ""
+    words = stop_words()
+    # Substring test against string.punctuation, as before, so runs like "()" are still dropped.
+    return " ".join(word for word in word_tokenize(text.lower()) if word not in PUNCTUATION and word not in words)
+
+
+def preprocess_chunk(texts):
+    return [preprocess_text(text) for text in texts]
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        # Spawn rather than fork: the Streamlit server process runs script threads (and possibly the scraper's
+        # QThread), and a forked child can deadlock on a lock one of them held.
+        _executor = ProcessPoolExecutor(max_workers=os.cpu_count() or 1,
+                                        mp_context=multiprocessing.get_context("spawn"), initializer=stop_words)
+        atexit.register(_executor.shutdown)
+    return _executor
+
+
+def map_chunks(func, items, chunk_rows=CHUNK_ROWS, min_parallel_rows=MIN_PARALLEL_ROWS):
+    items = list(items)
+    if len(items) < min_parallel_rows:
+        return func(items)
+    chunks = [items[start:start + chunk_rows] for start in range(0, len(items), chunk_rows)]
+    results = []
+    for chunk in get_executor().map(func, chunks):
+        results.extend(chunk)
+    return results
+
+
+def preprocess_texts(texts, chunk_rows=CHUNK_ROWS, min_parallel_rows=MIN_PARALLEL_ROWS):
+    return map_chunks(preprocess_chunk, texts, chunk_rows, min_parallel_rows)